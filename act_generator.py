@@ -4,20 +4,103 @@ Act Generator - Generate service completion acts with FX rates
 """
 
 import os
+import re
 import base64
+import calendar
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from dateutil.relativedelta import relativedelta
 from decimal import Decimal
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from cbr_simple import CBRClient
-from config import COMPANY_INFO, FINANCIAL_SETTINGS
+from config import COMPANY_INFO, FINANCIAL_SETTINGS, PDF_CONFIG
 
-try:
-    import weasyprint
-    WEASYPRINT_AVAILABLE = True
-except (ImportError, OSError) as e:
-    WEASYPRINT_AVAILABLE = False
-    WEASYPRINT_ERROR = str(e)
+
+@functools.lru_cache(maxsize=1)
+def _get_weasyprint():
+    """
+    Import WeasyPrint on first use.
+
+    The import pulls in heavy C libraries (cffi, Pango, fontconfig), so
+    deferring it keeps 'import act_generator' fast for callers that only
+    need HTML output or never reach PDF generation.
+    """
+    try:
+        import weasyprint
+        return weasyprint
+    except (ImportError, OSError) as e:
+        print("⚠️  WeasyPrint not available. Only HTML output will be generated.")
+        print(f"   Error: {e}")
+        return None
+
+
+# Russian month names in genitive case, indexed by month number - 1
+RUSSIAN_MONTHS = (
+    'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+    'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря'
+)
+
+# Screen-only stylesheet links are useless in the PDF but WeasyPrint
+# would still fetch and parse them; strip them before rendering.
+# Convention: only print-targeted <link> tags survive the PDF path.
+_SCREEN_LINK_RE = re.compile(r'<link[^>]+rel="stylesheet"[^>]*media="screen"[^>]*>')
+
+
+def _strip_screen_stylesheets(html_content):
+    """Remove screen-only <link rel="stylesheet"> tags for PDF rendering"""
+    return _SCREEN_LINK_RE.sub('', html_content)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_environment(templates_dir):
+    """
+    Build (once per templates_dir) the shared Jinja2 environment.
+
+    auto_reload is off because templates don't change at runtime, and
+    the bytecode cache persists compiled templates to disk so fresh
+    processes skip the parse/compile step entirely.
+    """
+    os.makedirs('.jinja_cache', exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(templates_dir),
+        bytecode_cache=FileSystemBytecodeCache('.jinja_cache'),
+        auto_reload=False
+    )
+
+
+def _shift_month(d, months):
+    """Shift a date back by the given number of months, clamping the day"""
+    m = d.month - 1 - months
+    year = d.year + m // 12
+    month = m % 12 + 1
+    day = min(d.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+@functools.lru_cache(maxsize=32)
+def _format_signature_name(name):
+    """
+    Convert "LASTNAME FIRSTNAME THIRDNAME" to "F.T. LASTNAME".
+
+    If the name doesn't have exactly three parts, it is used as-is.
+    Memoized because the same client name recurs across generations.
+    """
+    parts = name.split()
+    if len(parts) == 3:
+        return f"{parts[1][0]}.{parts[2][0]}. {parts[0]}"
+    return name
+
+
+@functools.lru_cache(maxsize=4)
+def _load_signature_cached(signature_path, mtime):
+    """
+    Read and base64-encode a signature image, cached by (path, mtime).
+
+    The mtime key invalidates the cache automatically when the file
+    changes, so repeat generations skip the disk read and re-encode.
+    """
+    with open(signature_path, 'rb') as f:
+        return base64.b64encode(f.read()).decode()
 
 
 class ActGenerator:
@@ -34,17 +117,35 @@ class ActGenerator:
         
         os.makedirs(output_dir, exist_ok=True)
         
-        # Setup Jinja2 environment
-        self.env = Environment(loader=FileSystemLoader(templates_dir))
-        
+        # Setup Jinja2 environment — shared per templates_dir so
+        # constructing many generators compiles each template once
+        self.env = _get_environment(templates_dir)
+
+        # Load the template once and reuse the compiled object
+        self.act_template = self.env.get_template('act.html')
+
         # Initialize CBR client
         self.cbr_client = CBRClient()
-        
-        if not WEASYPRINT_AVAILABLE:
-            print("⚠️  WeasyPrint not available. Only HTML output will be generated.")
-            if 'WEASYPRINT_ERROR' in globals():
-                print(f"   Error: {WEASYPRINT_ERROR}")
-    
+
+        # Font configuration is created lazily on the first PDF render
+        # (together with the WeasyPrint import) and then reused
+        self.font_config = None
+
+        # (date, periods) cache — default periods only change when the
+        # calendar day rolls over
+        self._periods_cache = (None, None)
+
+        # In-process memo for FX lookups; the CBR client adds the
+        # persistent disk layer underneath
+        self._fx_cache = {}
+
+    def _get_font_config(self):
+        """Build the WeasyPrint font configuration once and reuse it"""
+        if self.font_config is None and _get_weasyprint() is not None:
+            from weasyprint.text.fonts import FontConfiguration
+            self.font_config = FontConfiguration()
+        return self.font_config
+
     def get_default_periods(self):
         """
         Generate default service periods (26th of prev month to 26th of current month)
@@ -53,27 +154,37 @@ class ActGenerator:
             list: List of 4 periods with start and end dates
         """
         today = date.today()
-        
-        # Current period: 26th of prev month to 26th of current month
-        current_start = (today.replace(day=1) - relativedelta(months=1)).replace(day=26)
-        current_end = today.replace(day=26)
-        
+
+        # The result is deterministic for a given day — reuse it until
+        # the date rolls over
+        if self._periods_cache[0] == today:
+            return self._periods_cache[1]
+
+        # All periods run 26th to 26th, so each boundary is just
+        # "today's month shifted back i months" — plain integer month
+        # arithmetic, no relativedelta inside the loop
+        def _month_back(months):
+            m = today.month - 1 - months
+            return date(today.year + m // 12, m % 12 + 1, 26)
+
         periods = []
-        
+
         # Generate 4 periods going backwards
         for i in range(4):
-            period_end = current_end - relativedelta(months=i)
-            period_start = current_start - relativedelta(months=i)
-            
+            period_end = _month_back(i)
+            period_start = _month_back(i + 1)
+
             periods.append({
                 'start_date': period_start.strftime("%d.%m.%Y"),
                 'end_date': period_end.strftime("%d.%m.%Y"),
                 'start_date_obj': period_start,
                 'end_date_obj': period_end
             })
-        
+
         # Reverse to get chronological order
-        return list(reversed(periods))
+        periods = list(reversed(periods))
+        self._periods_cache = (today, periods)
+        return periods
     
     def get_fx_rate(self, currency='USD', date_req=None):
         """
@@ -88,10 +199,16 @@ class ActGenerator:
         """
         if date_req is None:
             date_req = date.today()
-        
+
+        cache_key = (currency, date_req)
+        cached = self._fx_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             rate = self.cbr_client.get_rate(currency, date_req)
             if rate:
+                self._fx_cache[cache_key] = rate
                 return rate
             else:
                 print(f"❌ Could not get {currency} rate for {date_req}")
@@ -100,6 +217,25 @@ class ActGenerator:
             print(f"❌ Error getting FX rate: {e}")
             return None
     
+    def get_fx_rates_bulk(self, currency, dates):
+        """
+        Get FX rates for several dates concurrently
+
+        The CBR lookup is network-bound, so fetching the dates in a
+        thread pool overlaps the round-trips; cached dates are served
+        from disk without touching the network at all.
+
+        Args:
+            currency (str): Currency code (e.g., 'USD')
+            dates (list): List of date objects to fetch rates for
+
+        Returns:
+            dict: Mapping of date -> Decimal rate (or None if failed)
+        """
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            rates = executor.map(lambda d: self.get_fx_rate(currency, d), dates)
+            return dict(zip(dates, rates))
+
     def generate_act_number(self):
         """Generate act number based on current date"""
         today = date.today()
@@ -107,12 +243,12 @@ class ActGenerator:
     
     def load_signature(self, signature_path='signatures/YL_Signature.png'):
         """Load signature image if available"""
-        if os.path.exists(signature_path):
-            try:
-                with open(signature_path, 'rb') as f:
-                    return base64.b64encode(f.read()).decode()
-            except Exception as e:
-                print(f"⚠️  Could not load signature from {signature_path}: {e}")
+        try:
+            return _load_signature_cached(signature_path, os.path.getmtime(signature_path))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️  Could not load signature from {signature_path}: {e}")
         return None
     
     def process_services_with_dates(self, services_input):
@@ -128,32 +264,30 @@ class ActGenerator:
         """
         if not services_input:
             return []
-        
+
         result_services = []
-        
+
+        # The default period is the same for every service in this call —
+        # compute and format it once instead of per iteration
+        today = date.today()
+        default_dates = {
+            'start_date': _shift_month(today, 1).replace(day=26).strftime("%d/%m/%Y"),
+            'end_date': today.replace(day=26).strftime("%d/%m/%Y")
+        }
+
         for i, service in enumerate(services_input):
             if isinstance(service, str):
-                # Service is just a description string              
-                today = date.today()
-                result_services.append({
-                    'description': service,
-                    'start_date': (today.replace(day=1) - relativedelta(months=1)).replace(day=26).strftime("%d/%m/%Y"),
-                    'end_date': today.replace(day=26).strftime("%d/%m/%Y")
-                })
-                
+                # Service is just a description string
+                result_services.append({'description': service, **default_dates})
+
             elif isinstance(service, dict):
                 # Service is already a dictionary
                 if 'start_date' in service and 'end_date' in service:
                     # Already has dates, use as-is
                     result_services.append(service)
                 else:
-                    # Has description but missing dates, add them                    
-                    today = date.today()
-                    result_services.append({
-                        'description': service.get('description', ''),
-                        'start_date': (today.replace(day=1) - relativedelta(months=1)).replace(day=26).strftime("%d/%m/%Y"),
-                        'end_date': today.replace(day=26).strftime("%d/%m/%Y")
-                    })
+                    # Has description but missing dates, add them
+                    result_services.append({'description': service.get('description', ''), **default_dates})
             else:
                 print(f"⚠️  Invalid service format at index {i}: {service}")
                 continue
@@ -225,13 +359,7 @@ class ActGenerator:
             },
             'customer': {
                 'name': client_info['name'],
-                # Convert "LASTNAME FIRSTNAME THIRDNAME" to "F. T. LASTNAME"
-                # If only one name is present, use as is
-                'signature_name': (
-                    f"{name_parts[1][0]}.{name_parts[2][0]}. {name_parts[0]}"
-                    if (len((name_parts := client_info['name'].split())) == 3)
-                    else client_info['name']
-                )
+                'signature_name': _format_signature_name(client_info['name'])
             },
             'contractor': {
                 'legal_form': company_info['legal_form'],
@@ -256,16 +384,14 @@ class ActGenerator:
             }
         }
         
-        # Load and render template
-        template = self.env.get_template('act.html')
-        html_content = template.render(**template_data)
+        # Render the cached template
+        html_content = self.act_template.render(**template_data)
         
         # Generate filename with timestamp
         timestamp = generation_date.strftime("%Y%m")
         filename = f"Акт_{timestamp}"
         
         # Save HTML only if configured to do so
-        from config import PDF_CONFIG
         html_path = None
         if PDF_CONFIG.get('generate_html', False):
             html_path = os.path.join(self.output_dir, f"{filename}.html")
@@ -275,9 +401,10 @@ class ActGenerator:
         # Try to generate PDF
         pdf_path = os.path.join(self.output_dir, f"{filename}.pdf")
         
-        if WEASYPRINT_AVAILABLE:
+        weasyprint = _get_weasyprint()
+        if weasyprint is not None:
             try:
-                weasyprint.HTML(string=html_content, base_url=self.templates_dir).write_pdf(pdf_path)
+                weasyprint.HTML(string=_strip_screen_stylesheets(html_content), base_url=self.templates_dir).write_pdf(pdf_path, font_config=self._get_font_config())
                 print(f"✅ PDF generated with WeasyPrint: {pdf_path}")
                 return pdf_path
             except Exception as e:
@@ -363,13 +490,7 @@ class ActGenerator:
             },
             'customer': {
                 'name': client_info['name'],
-                # Convert "LASTNAME FIRSTNAME THIRDNAME" to "F. T. LASTNAME"
-                # If only one name is present, use as is
-                'signature_name': (
-                    f"{name_parts[1][0]}.{name_parts[2][0]}. {name_parts[0]}"
-                    if (len((name_parts := client_info['name'].split())) == 3)
-                    else client_info['name']
-                )
+                'signature_name': _format_signature_name(client_info['name'])
             },
             'contractor': {
                 'legal_form': company_info['legal_form'],
@@ -394,16 +515,14 @@ class ActGenerator:
             }
         }
         
-        # Load and render template
-        template = self.env.get_template('act.html')
-        html_content = template.render(**template_data)
+        # Render the cached template
+        html_content = self.act_template.render(**template_data)
         
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m")
+        # Generate filename with timestamp (reuse the already-computed date)
+        timestamp = today.strftime("%Y%m")
         filename = f"Акт_{timestamp}"
         
         # Save HTML only if configured to do so
-        from config import PDF_CONFIG
         html_path = None
         if PDF_CONFIG.get('generate_html', False):
             html_path = os.path.join(self.output_dir, f"{filename}.html")
@@ -413,9 +532,10 @@ class ActGenerator:
         # Try to generate PDF
         pdf_path = os.path.join(self.output_dir, f"{filename}.pdf")
         
-        if WEASYPRINT_AVAILABLE:
+        weasyprint = _get_weasyprint()
+        if weasyprint is not None:
             try:
-                weasyprint.HTML(string=html_content, base_url=self.templates_dir).write_pdf(pdf_path)
+                weasyprint.HTML(string=_strip_screen_stylesheets(html_content), base_url=self.templates_dir).write_pdf(pdf_path, font_config=self._get_font_config())
                 print(f"✅ PDF generated with WeasyPrint: {pdf_path}")
                 return pdf_path
             except Exception as e:
@@ -435,12 +555,7 @@ class ActGenerator:
     
     def get_russian_month(self, month_num):
         """Convert month number to Russian month name"""
-        months = {
-            1: 'января', 2: 'февраля', 3: 'марта', 4: 'апреля',
-            5: 'мая', 6: 'июня', 7: 'июля', 8: 'августа',
-            9: 'сентября', 10: 'октября', 11: 'ноября', 12: 'декабря'
-        }
-        return months.get(month_num, 'января')
+        return RUSSIAN_MONTHS[month_num - 1] if 1 <= month_num <= 12 else RUSSIAN_MONTHS[0]
 
 
 def main():
@@ -57,10 +57,10 @@ def example_document_generation():
     
     # Show results
     print(f"Results:")
-    print(f"  Act: {'✅' if results['act_path'] else '❌'}")
-    print(f"  Invoice: {'✅' if results['invoice_path'] else '❌'}")
-    if results['act_amount']:
-        print(f"  Amount: {results['act_amount']:,.0f} RUB")
+    print(f"  Act: {'✅' if results.act_path else '❌'}")
+    print(f"  Invoice: {'✅' if results.invoice_path else '❌'}")
+    if results.amount:
+        print(f"  Amount: {results.amount:,.0f} RUB")
 
 
 def example_configuration():
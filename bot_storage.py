@@ -3,26 +3,48 @@ Simple storage for Telegram bot data
 Stores previous services and user preferences
 """
 
+import atexit
 import json
 import os
+import threading
 from datetime import datetime
 from typing import List, Dict
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 
 class BotStorage:
     """Simple JSON-based storage for bot data"""
     
+    # Seconds to wait after the last mutation before flushing to disk
+    FLUSH_DELAY = 2.0
+
     def __init__(self, storage_file: str = 'bot_data.json'):
         self.storage_file = storage_file
         self.data = self._load_data()
+
+        # Debounced writes: mutations schedule a flush instead of
+        # rewriting the file immediately, collapsing bursts into one
+        # write. atexit guarantees pending changes hit disk on
+        # shutdown; the dirty flag keeps read-only processes (anything
+        # that merely imports this module) from rewriting the file.
+        self._flush_timer = None
+        self._flush_lock = threading.Lock()
+        self._dirty = False
+        atexit.register(self.flush)
     
     def _load_data(self) -> Dict:
         """Load data from storage file"""
         if os.path.exists(self.storage_file):
             try:
-                with open(self.storage_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
+                with open(self.storage_file, 'rb') as f:
+                    raw = f.read()
+                return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+            except (ValueError, IOError) as e:
                 print(f"⚠️  Error loading storage file: {e}")
                 return self._get_default_data()
         else:
@@ -47,13 +69,38 @@ class BotStorage:
     def save_data(self) -> bool:
         """Save data to storage file"""
         try:
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            if ORJSON_AVAILABLE:
+                serialized = orjson.dumps(self.data, option=orjson.OPT_INDENT_2)
+            else:
+                serialized = json.dumps(self.data, ensure_ascii=False, indent=2).encode('utf-8')
+            with open(self.storage_file, 'wb') as f:
+                f.write(serialized)
             return True
         except IOError as e:
             print(f"❌ Error saving storage file: {e}")
             return False
     
+    def _schedule_save(self):
+        """Schedule a debounced save, restarting the timer on each mutation"""
+        with self._flush_lock:
+            self._dirty = True
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(self.FLUSH_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self) -> bool:
+        """Write any pending changes to disk; no-op when nothing is dirty"""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return True
+            self._dirty = False
+        return self.save_data()
+
     def get_last_services(self) -> List[str]:
         """Get the last used services"""
         return self.data.get('last_services', [])
@@ -63,7 +110,8 @@ class BotStorage:
         self.data['last_services'] = services
         self.data['last_generation_date'] = datetime.now().isoformat()
         self.data['generation_count'] = self.data.get('generation_count', 0) + 1
-        return self.save_data()
+        self._schedule_save()
+        return True
     
     def get_generation_stats(self) -> Dict:
         """Get generation statistics"""
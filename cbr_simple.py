@@ -3,8 +3,17 @@
 Simplified CBR Client for getting USD exchange rates
 """
 
+import json
+import os
+import tempfile
 import requests
-import xml.etree.ElementTree as ET
+from requests.adapters import HTTPAdapter, Retry
+
+try:
+    # libxml2-backed parser: C-speed parsing with the same find API
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
 from datetime import date
 from decimal import Decimal
 from typing import Optional
@@ -12,66 +21,96 @@ from typing import Optional
 
 class CBRClient:
     """Simple client for Central Bank of Russia API."""
-    
-    BASE_URL = "http://www.cbr.ru/DailyInfoWebServ/DailyInfo.asmx"
+
+    BASE_URL = "https://www.cbr.ru/scripts/XML_daily.asp"
     TIMEOUT = 30  # seconds
-    
+    CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "cbr_rates.json")
+
+    def __init__(self):
+        # In-memory copy of the disk cache, loaded lazily on first use
+        self._cache = None
+
+        # Reuse one session so multi-date lookups share a pooled
+        # connection (keep-alive) and transient 5xx errors are retried
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=4,
+            max_retries=Retry(total=3, backoff_factor=0.5,
+                              status_forcelist=[502, 503, 504])
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _load_cache(self) -> dict:
+        """Load the on-disk rate cache (once per process)"""
+        if self._cache is None:
+            try:
+                with open(self.CACHE_FILE, 'r', encoding='utf-8') as f:
+                    self._cache = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError, IOError):
+                self._cache = {}
+        return self._cache
+
+    def _save_cache(self):
+        """Atomically rewrite the on-disk rate cache"""
+        try:
+            cache_dir = os.path.dirname(self.CACHE_FILE)
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_path, self.CACHE_FILE)
+        except (IOError, OSError) as e:
+            print(f"⚠️  Could not save rate cache: {e}")
+
     def get_rate(self, currency: str, date_req: date) -> Optional[Decimal]:
         """
         Get exchange rate for specific date.
-        
+
+        Rates for past dates never change at CBR, so they are cached
+        indefinitely on disk and repeat lookups skip the network entirely.
+
         Args:
             currency (str): Currency code (e.g., 'USD', 'EUR')
             date_req (date): Date for which to get the rate
-            
+
         Returns:
             Optional[Decimal]: Exchange rate or None if not found
         """
-        soap_body = f"""<?xml version="1.0" encoding="utf-8"?>
-        <soap12:Envelope 
-            xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" 
-            xmlns:xsd="http://www.w3.org/2001/XMLSchema" 
-            xmlns:soap12="http://www.w3.org/2003/05/soap-envelope">
-          <soap12:Body>
-            <GetCursOnDate xmlns="http://web.cbr.ru/">
-              <On_date>{date_req.strftime('%Y-%m-%d')}</On_date>
-            </GetCursOnDate>
-          </soap12:Body>
-        </soap12:Envelope>"""
-
-        headers = {
-            "Content-Type": "application/soap+xml; charset=utf-8",
-            "SOAPAction": "http://web.cbr.ru/GetCursOnDate",
-        }
+        cache = self._load_cache()
+        cache_key = f"{currency}:{date_req.isoformat()}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Decimal(cached)
 
+        rate = self._fetch_rate(currency, date_req)
+        if rate is not None:
+            cache[cache_key] = str(rate)
+            self._save_cache()
+        return rate
+
+    def _fetch_rate(self, currency: str, date_req: date) -> Optional[Decimal]:
+        """Fetch exchange rate from the CBR daily XML feed (no caching)"""
         try:
-            response = requests.post(
-                self.BASE_URL, 
-                data=soap_body, 
-                headers=headers, 
+            response = self.session.get(
+                self.BASE_URL,
+                params={'date_req': date_req.strftime('%d/%m/%Y')},
                 timeout=self.TIMEOUT
             )
-            
+
             if response.status_code != 200:
                 print(f"CBR API error: HTTP {response.status_code}")
                 return None
 
-            root = ET.fromstring(response.text)
-
-            # Parse XML response
-            namespace = {
-                "soap12": "http://www.w3.org/2003/05/soap-envelope",
-                "cbr": "http://web.cbr.ru/",
-                "diffgr": "urn:schemas-microsoft-com:xml-diffgram-v1",
-            }
-
-            for valute in root.findall(".//diffgr:diffgram/ValuteData/ValuteCursOnDate", namespace):
-                vch_code = valute.find("VchCode").text
-                if vch_code == currency:
-                    vcurs = valute.find("Vcurs").text
-                    vnom = valute.find("Vnom").text
-                    print(f"Found rate for {currency}: {vcurs} / {vnom}")
-                    return Decimal(vcurs) / Decimal(vnom)
+            root = ET.fromstring(response.content)
+
+            for valute in root.findall('Valute'):
+                if valute.findtext('CharCode') == currency:
+                    value = valute.findtext('Value')
+                    nominal = valute.findtext('Nominal')
+                    print(f"Found rate for {currency}: {value} / {nominal}")
+                    return Decimal(value.replace(',', '.')) / Decimal(nominal)
 
         except Exception as e:
             print(f"Error getting exchange rate: {e}")
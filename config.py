@@ -34,8 +34,12 @@ CLIENT_INFO = {
 }
 
 # Financial settings
+# BASE_RATE may be absent in minimal setups (e.g. storage-only scripts);
+# default to 0 so the module stays importable instead of raising
+# TypeError at import time
+_BASE_RATE_RAW = os.getenv('BASE_RATE', '0')
 FINANCIAL_SETTINGS = {
-    'base_rate': int(os.getenv('BASE_RATE')),  # Base rate in USD
+    'base_rate': int(_BASE_RATE_RAW) if _BASE_RATE_RAW else 0,  # Base rate in USD
     'currency': os.getenv('CURRENCY'),           # Default currency for FX rate
 }
 
@@ -43,6 +47,10 @@ FINANCIAL_SETTINGS = {
 TELEGRAM_CONFIG = {
     'bot_token': os.getenv('TELEGRAM_BOT_TOKEN'),
     'chat_id': os.getenv('TELEGRAM_CHAT_ID'),
+    # When set (e.g. https://bot.example.com), the bot receives updates
+    # via webhook instead of long-polling
+    'webhook_url': os.getenv('TELEGRAM_WEBHOOK_URL'),
+    'webhook_port': int(os.getenv('TELEGRAM_WEBHOOK_PORT') or '8443'),
 }
 
 # File paths
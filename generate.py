@@ -40,18 +40,18 @@ def main():
     print("📋 DOCUMENT GENERATION COMPLETE")
     print(f"{'='*60}")
     
-    if results['act_path']:
-        print(f"✅ Act:     {results['act_path']}")
+    if results.act_path:
+        print(f"✅ Act:     {results.act_path}")
     else:
         print("❌ Act:     FAILED")
-        
-    if results['invoice_path']:
-        print(f"✅ Invoice: {results['invoice_path']}")
+
+    if results.invoice_path:
+        print(f"✅ Invoice: {results.invoice_path}")
     else:
         print("❌ Invoice: FAILED")
-    
-    if results['act_amount']:
-        print(f"💰 Amount:  {results['act_amount']:,.0f} RUB")
+
+    if results.amount:
+        print(f"💰 Amount:  {results.amount:,.0f} RUB")
     
     print(f"📂 Location: output/")
     print(f"{'='*60}")
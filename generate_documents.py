@@ -5,29 +5,93 @@ Generates both Invoice and Act PDFs from a single interface
 """
 
 import base64
+import mmap
 import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 
-# Import our generators and config
+# Import config; the generators themselves are imported lazily so that
+# single-document flows don't pay for both import chains
 from config import BANK_INFO, COMPANY_INFO, CLIENT_INFO, FINANCIAL_SETTINGS
-from invoice_generator_html import InvoiceGeneratorHTML
-from act_generator import ActGenerator
+
+# Russian month names in genitive case, indexed by month number - 1
+RUSSIAN_MONTHS = (
+    'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+    'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря'
+)
+
+# Immutable result of a combined generation run; attribute access is
+# cheaper than dict lookups and fields can't be set inconsistently
+GenerationResult = namedtuple('GenerationResult', 'invoice_path act_path amount')
 
 
 class UnifiedDocumentGenerator:
     """
     Unified generator for both invoices and acts
     """
-    
+
+    # Encoded signatures keyed by (path, mtime_ns), shared across
+    # instances so a batch re-reads the file only when it changes
+    _signature_cache = {}
+
+    # Underlying generators are process-wide singletons: every
+    # UnifiedDocumentGenerator shares them, so templates are parsed and
+    # compiled once no matter how many instances a batch constructs
+    _shared_invoice_generator = None
+    _shared_act_generator = None
+    _generator_lock = threading.Lock()
+
     def __init__(self):
-        self.invoice_generator = InvoiceGeneratorHTML()
-        self.act_generator = ActGenerator()
-        
-        # Parse contract date from config
-        contract_date_str = CLIENT_INFO['contract_date']
-        year, month, day = map(int, contract_date_str.split('-'))
-        self.contract_date = date(year, month, day)        
-        
+        # Payee/payer blocks are built from invariant config, so they
+        # are formatted once on first use and reused across invoices
+        self._payee_dict = None
+        self._payer_dict = None
+
+        # Parse contract date from config (ISO format, YYYY-MM-DD)
+        self.contract_date = date.fromisoformat(CLIENT_INFO['contract_date'])
+
+    @property
+    def invoice_generator(self):
+        """Build the shared invoice generator on first use"""
+        cls = UnifiedDocumentGenerator
+        if cls._shared_invoice_generator is None:
+            with cls._generator_lock:
+                if cls._shared_invoice_generator is None:
+                    from invoice_generator_html import InvoiceGeneratorHTML
+                    cls._shared_invoice_generator = InvoiceGeneratorHTML()
+        return cls._shared_invoice_generator
+
+    @property
+    def act_generator(self):
+        """Build the shared act generator on first use"""
+        cls = UnifiedDocumentGenerator
+        if cls._shared_act_generator is None:
+            with cls._generator_lock:
+                if cls._shared_act_generator is None:
+                    from act_generator import ActGenerator
+                    cls._shared_act_generator = ActGenerator()
+        return cls._shared_act_generator
+
+    def prefetch_fx_rates(self, dates, currency):
+        """
+        Warm the FX caches for a batch of dates in one concurrent sweep
+
+        Issues the CBR requests in parallel so N sequential round-trips
+        collapse into roughly one. Subsequent generate_both_documents
+        calls for those dates hit the cache and never block on the
+        network.
+
+        Args:
+            dates (list): date objects to prefetch rates for
+            currency (str): Currency code (e.g., 'USD')
+
+        Returns:
+            dict: date -> rate (None for dates CBR had no rate for)
+        """
+        return self.act_generator.get_fx_rates_bulk(currency, dates)
+
     def generate_both_documents(
         self,
         services_list,
@@ -36,76 +100,80 @@ class UnifiedDocumentGenerator:
         client_info,
         financial_settings,
         signature_path,
-        generation_date=None
+        generation_date=None,
+        signature_data=None
         ):
         """
         Generate both invoice and act for the given services
-        
+
         Args:
             services_list (list): List of service descriptions (strings) or service dicts
             company_info (dict): Company information
-            bank_info (dict): Bank information 
+            bank_info (dict): Bank information
             client_info (dict): Client information
             financial_settings (dict): Financial settings
             signature_path (str): Path to signature image
             generation_date (date): Date for document generation (default: today)
-            
+            signature_data (str): Pre-encoded base64 signature; when
+                given the file at signature_path is not touched at all
+
         Returns:
-            dict: Paths to generated files or None values on failure
+            GenerationResult: Paths to generated files and the total
+                amount, with None fields on failure
         """
-        
+
         print("🚀 Unified Document Generator")
         print("=" * 50)
-        
+
         # Set generation date
         if generation_date is None:
             generation_date = date.today()
-        
+
         print(f"📅 Generation date: {generation_date.strftime('%d.%m.%Y')}")
-        
-        results = {
-            'invoice_path': None,
-            'act_path': None,
-            'invoice_amount': None,
-            'act_amount': None
-        }
 
-        # Load signature
-        if os.path.exists(signature_path):
-            try:
-                with open(signature_path, 'rb') as f:
-                    self.signature_data = base64.b64encode(f.read()).decode()
-                    print("✅ Signature loaded")
-            except Exception as e:
-                print(f"⚠️  Could not load signature: {e}")
-        
+        # Load the signature in the background while the FX request is
+        # in flight — the two are independent, so the read+encode cost
+        # disappears behind the network round-trip. Long-lived callers
+        # (the bot) pass signature_data directly and skip the disk
+        # entirely.
+        signature_future = None
+        if signature_data is None:
+            signature_executor = ThreadPoolExecutor(max_workers=1)
+            signature_future = signature_executor.submit(self._load_signature, signature_path)
+
         # GET FX RATE ONCE and calculate total amount
         print(f"\n💱 Fetching {financial_settings['currency']} exchange rate...")
         try:
             fx_rate = self.act_generator.get_fx_rate(financial_settings['currency'], generation_date)
+            if signature_future is not None:
+                signature_data = signature_future.result()
+                signature_executor.shutdown()
+            self.signature_data = signature_data
             if fx_rate is None:
                 print(f"❌ Cannot generate documents: Failed to get {financial_settings['currency']} exchange rate from CBR")
-                return results
-            
+                return GenerationResult(None, None, None)
+
             # Calculate total amount and round to nearest 10
             total_amount_exact = financial_settings['base_rate'] * fx_rate
             total_amount = round(total_amount_exact / 10) * 10  # Round to nearest 10
-            
+
             print(f"💰 Exchange rate: {fx_rate}")
             print(f"💰 Base rate: {financial_settings['base_rate']:,}")
             print(f"💰 Calculated amount: {total_amount:,} RUB (rounded from {total_amount_exact:,.2f})")
-            
-            results['act_amount'] = total_amount
-            results['invoice_amount'] = total_amount
-            
+
         except Exception as e:
             print(f"❌ Error fetching exchange rate: {e}")
-            return results
+            return GenerationResult(None, None, None)
         
-        # 1. Generate Act 
-        print("\n📋 Generating Service Act...")
-        try:
-            act_path = self.act_generator.generate_act_with_precalculated(
+        # Generate Act and Invoice concurrently — they are independent
+        # once the FX rate and total amount are known, and both are
+        # dominated by PDF rendering
+        print("\n📋 Generating Service Act and Invoice...")
+        invoice_data = self._prepare_invoice_data(total_amount, company_info, bank_info, client_info, generation_date)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            act_future = executor.submit(
+                self.act_generator.generate_act_with_precalculated,
                 services_list=services_list,
                 company_info=company_info,
                 client_info=client_info,
@@ -114,37 +182,67 @@ class UnifiedDocumentGenerator:
                 fx_rate=fx_rate,
                 total_amount=total_amount
             )
-            
-            if act_path:
-                print(f"✅ Act generated: {os.path.basename(act_path)}")
-                results['act_path'] = act_path
-            else:
-                print("❌ Act generation failed")
-                return results
-        except Exception as e:
-            print(f"❌ Act generation error: {e}")
-            return results
-        
-        # 2. Generate Invoice
-        print("\n🧾 Generating Invoice...")
+            invoice_future = executor.submit(self.invoice_generator.generate_invoice, invoice_data)
+
+            try:
+                act_path = act_future.result()
+                if act_path:
+                    print(f"✅ Act generated: {os.path.basename(act_path)}")
+                else:
+                    print("❌ Act generation failed")
+            except Exception as e:
+                print(f"❌ Act generation error: {e}")
+                act_path = None
+
+            try:
+                invoice_path = invoice_future.result()
+                if invoice_path:
+                    print(f"✅ Invoice generated: {os.path.basename(invoice_path)}")
+                else:
+                    print("❌ Invoice generation failed")
+            except Exception as e:
+                print(f"❌ Invoice generation error: {e}")
+                invoice_path = None
+
+        return GenerationResult(invoice_path, act_path, total_amount)
+    
+    def preload_signature(self, signature_path):
+        """
+        Encode the signature once for reuse across generations
+
+        Long-running callers (the Telegram bot) call this at startup
+        and pass the returned value as signature_data to
+        generate_both_documents, keeping the per-request path free of
+        filesystem and encoding work.
+
+        Args:
+            signature_path (str): Path to signature image
+
+        Returns:
+            str: Base64-encoded signature, or None if unavailable
+        """
+        return self._load_signature(signature_path)
+
+    def _load_signature(self, signature_path):
+        """Load and base64-encode the signature image, or None if unavailable"""
         try:
-            # Prepare invoice data with generation date
-            invoice_data = self._prepare_invoice_data(total_amount, company_info, bank_info, client_info, generation_date)
-            
-            invoice_path = self.invoice_generator.generate_invoice(invoice_data)
-            
-            if invoice_path:
-                print(f"✅ Invoice generated: {os.path.basename(invoice_path)}")
-                results['invoice_path'] = invoice_path
-                results['invoice_amount'] = results['act_amount']
-            else:
-                print("❌ Invoice generation failed")
-                
+            cache_key = (signature_path, os.stat(signature_path).st_mtime_ns)
+            signature_data = self._signature_cache.get(cache_key)
+            if signature_data is None:
+                # Memory-map the file so b64encode reads the page cache
+                # directly instead of going through an intermediate copy
+                with open(signature_path, 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        signature_data = base64.b64encode(mm).decode('ascii')
+                self._signature_cache[cache_key] = signature_data
+            print("✅ Signature loaded")
+            return signature_data
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            print(f"❌ Invoice generation error: {e}")
-        
-        return results
-    
+            print(f"⚠️  Could not load signature: {e}")
+        return None
+
     def _prepare_invoice_data(
         self,
         total_amount,
@@ -176,9 +274,10 @@ class UnifiedDocumentGenerator:
             'total': total_amount
         })
         
-        # Prepare full invoice data
-        invoice_data = {
-            'payee': {
+        # Build the payee block (including the long details string) only
+        # on the first call; it only depends on static config
+        if self._payee_dict is None:
+            self._payee_dict = {
                 'legal_form': company_info['legal_form'],
                 'legal_form_short': company_info['legal_form_short'],
                 'name': company_info['name'],
@@ -188,15 +287,20 @@ class UnifiedDocumentGenerator:
                 'bank_corr_account': bank_info['corresp_acc'],
                 'account_number': bank_info['personal_acc'],
                 'details_string': f"{company_info['name']}, ИНН {company_info['inn']}, р/с {bank_info['personal_acc']}, в банке {bank_info['bank_name']}, БИК {bank_info['bic']}, к/с {bank_info['corresp_acc']}"
-            },
-            'payer': {
+            }
+            self._payer_dict = {
                 'name': client_info['name']
-            },
+            }
+
+        # Prepare full invoice data
+        invoice_data = {
+            'payee': self._payee_dict,
+            'payer': self._payer_dict,
             'invoice': {
                 'number': '',
                 'date': (
-                    f"{generation_date.strftime('%d')} "
-                    f"{self.act_generator.get_russian_month(generation_date.month)} "
+                    f"{generation_date.day:02d} "
+                    f"{RUSSIAN_MONTHS[generation_date.month - 1]} "
                     f"{generation_date.year} г."
                 )
             },
@@ -226,18 +330,18 @@ class UnifiedDocumentGenerator:
     def generate_invoice_only(self, services_list, amount):
         """Generate only invoice"""
         print("🧾 Generating Invoice Only...")
-        invoice_data = self._prepare_invoice_data(amount, COMPANY_INFO, BANK_INFO, CLIENT_INFO)
+        invoice_data = self._prepare_invoice_data(amount, COMPANY_INFO, BANK_INFO, CLIENT_INFO, date.today())
         return self.invoice_generator.generate_invoice(invoice_data)
-    
+
     def generate_act_only(self, services_list):
         """Generate only act"""
         print("📋 Generating Act Only...")
         return self.act_generator.generate_act(
             services_list=services_list,
-            currency=FINANCIAL_SETTINGS['currency'],
-            customer_name=CLIENT_INFO['name'],
-            contract_date=self.contract_date,
-            base_rate=FINANCIAL_SETTINGS['base_rate']
+            company_info=COMPANY_INFO,
+            client_info=CLIENT_INFO,
+            financial_settings=FINANCIAL_SETTINGS,
+            signature_data=self.act_generator.load_signature()
         )
 
 
@@ -259,7 +363,7 @@ def main():
     
     # Generate both documents
     results = generator.generate_both_documents(
-        services=services,
+        services_list=services,
         company_info=COMPANY_INFO,
         bank_info=BANK_INFO,
         client_info=CLIENT_INFO,
@@ -270,11 +374,11 @@ def main():
     # Print summary
     print("\n" + "=" * 50)
     print("📊 Generation Summary:")
-    print(f"📋 Act: {'✅ ' + os.path.basename(results['act_path']) if results['act_path'] else '❌ Failed'}")
-    print(f"🧾 Invoice: {'✅ ' + os.path.basename(results['invoice_path']) if results['invoice_path'] else '❌ Failed'}")
-    
-    if results['act_amount']:
-        print(f"💰 Amount: {results['act_amount']:,.0f} RUB")
+    print(f"📋 Act: {'✅ ' + os.path.basename(results.act_path) if results.act_path else '❌ Failed'}")
+    print(f"🧾 Invoice: {'✅ ' + os.path.basename(results.invoice_path) if results.invoice_path else '❌ Failed'}")
+
+    if results.amount:
+        print(f"💰 Amount: {results.amount:,.0f} RUB")
     
     print(f"📂 Output folder: {os.path.abspath('output')}")
 
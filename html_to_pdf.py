@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+HTML to PDF Converter using external engines (wkhtmltopdf / Chrome)
+Windows-friendly fallback when WeasyPrint is not available
+"""
+
+import base64
+import functools
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import urllib.request
+import weakref
+
+try:
+    import websocket
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+# Chrome/Chromium executable names resolved via PATH, in preference
+# order, plus default Windows install locations for setups where
+# Chrome is not on PATH
+CHROME_NAMES = (
+    'google-chrome',
+    'google-chrome-stable',
+    'chromium',
+    'chromium-browser',
+    'chrome',
+)
+CHROME_WINDOWS_PATHS = (
+    r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+    r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe',
+)
+
+# Flags for one-shot PDF printing, built once. Besides the usual
+# headless hygiene (--disable-gpu etc.), --virtual-time-budget makes
+# Chrome fast-forward timers and print immediately instead of waiting
+# for network idle, and --no-pdf-header-footer drops the default
+# date/URL chrome around the page.
+_CHROME_FLAGS = (
+    '--headless=new',
+    '--disable-gpu',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--hide-scrollbars',
+    '--mute-audio',
+    '--disable-extensions',
+    '--no-first-run',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--no-pdf-header-footer',
+    '--run-all-compositor-stages-before-draw',
+    '--virtual-time-budget=10000',
+)
+
+
+def _shutdown_chrome(process, profile_dir):
+    """Terminate a headless Chrome and remove its profile directory"""
+    if process is not None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    if profile_dir is not None:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_methods(path_env):
+    """
+    Detect available conversion engines (cached per PATH value)
+
+    Uses shutil.which/os.path.isfile — plain file-system stat lookups —
+    instead of spawning each candidate with --version, so detection
+    costs microseconds rather than one process launch per candidate.
+
+    Args:
+        path_env (str): Value of the PATH environment variable (cache key)
+
+    Returns:
+        dict: Method name ('wkhtmltopdf', 'chrome') -> executable path
+    """
+    methods = {}
+
+    wkhtmltopdf = shutil.which('wkhtmltopdf', path=path_env)
+    if wkhtmltopdf:
+        methods['wkhtmltopdf'] = wkhtmltopdf
+
+    for name in CHROME_NAMES:
+        found = shutil.which(name, path=path_env)
+        if found:
+            methods['chrome'] = found
+            break
+    else:
+        for candidate in CHROME_WINDOWS_PATHS:
+            if os.path.isfile(candidate):
+                methods['chrome'] = candidate
+                break
+
+    return methods
+
+
+class HTMLToPDFConverter:
+    """Convert rendered HTML to PDF via wkhtmltopdf or headless Chrome"""
+
+    # Seconds to wait for Chrome to expose its DevTools endpoint
+    CHROME_STARTUP_TIMEOUT = 15
+
+    # Seconds to wait for a CDP command response or page event; on
+    # expiry the session is torn down and conversion falls over to the
+    # one-shot Chrome path instead of hanging the pipeline
+    CDP_TIMEOUT = 30
+
+    def __init__(self):
+        # Detection is cached module-wide, so repeated converter
+        # construction (batch runs) never re-probes the file system
+        self.available_methods = _detect_methods(os.environ.get('PATH', ''))
+
+        # Persistent Chrome session (started lazily on first CDP
+        # conversion): spawning Chrome once and driving it over the
+        # DevTools Protocol amortizes the 0.5-1.5s cold start across
+        # every document in a batch
+        self._chrome_process = None
+        self._chrome_ws = None
+        self._chrome_profile_dir = None
+        self._cdp_msg_id = 0
+        self._chrome_finalizer = None
+        # Events that arrive while waiting for a command response are
+        # buffered here so _cdp_wait_event still sees them
+        self._cdp_events = []
+
+        if not self.available_methods:
+            print("⚠️  No HTML-to-PDF engine found (wkhtmltopdf or Chrome)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Tear down the persistent Chrome session, if one was started"""
+        if self._chrome_ws is not None:
+            try:
+                self._chrome_ws.close()
+            except Exception:
+                pass
+            self._chrome_ws = None
+        self._cdp_events.clear()
+        if self._chrome_finalizer is not None:
+            # Runs _shutdown_chrome at most once, whether invoked here,
+            # at garbage collection, or at interpreter exit
+            self._chrome_finalizer()
+            self._chrome_finalizer = None
+        self._chrome_process = None
+        self._chrome_profile_dir = None
+
+    def _ensure_chrome_session(self):
+        """Start Chrome once and connect to its DevTools websocket"""
+        if self._chrome_ws is not None:
+            return self._chrome_ws
+
+        self._chrome_profile_dir = tempfile.mkdtemp(prefix='invoice_chrome_')
+        self._chrome_process = subprocess.Popen(
+            [
+                self.available_methods['chrome'],
+                '--headless=new',
+                '--remote-debugging-port=0',
+                '--disable-gpu',
+                '--no-sandbox',
+                f'--user-data-dir={self._chrome_profile_dir}',
+                'about:blank'
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        # Guarantee the spawned Chrome dies with us even when close()
+        # is never called (short-lived CLI runs, dropped converters) —
+        # finalize also fires at interpreter exit
+        self._chrome_finalizer = weakref.finalize(
+            self, _shutdown_chrome,
+            self._chrome_process, self._chrome_profile_dir)
+
+        # Chrome writes the chosen debugging port to DevToolsActivePort
+        # inside the profile dir once the endpoint is up
+        port_file = os.path.join(self._chrome_profile_dir, 'DevToolsActivePort')
+        deadline = time.monotonic() + self.CHROME_STARTUP_TIMEOUT
+        port = None
+        while time.monotonic() < deadline:
+            try:
+                with open(port_file, 'r', encoding='utf-8') as f:
+                    port = int(f.readline().strip())
+                break
+            except (FileNotFoundError, ValueError):
+                time.sleep(0.05)
+        if port is None:
+            raise RuntimeError("Chrome did not expose a DevTools port in time")
+
+        # Find the page target's websocket URL
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/json') as resp:
+            targets = json.loads(resp.read())
+        ws_url = next(t['webSocketDebuggerUrl'] for t in targets
+                      if t.get('type') == 'page')
+
+        self._chrome_ws = websocket.create_connection(ws_url)
+        self._cdp_send('Page.enable')
+        return self._chrome_ws
+
+    def _cdp_recv(self, deadline):
+        """Receive one CDP frame, failing once the deadline passes"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RuntimeError("CDP response timed out")
+        self._chrome_ws.settimeout(remaining)
+        return json.loads(self._chrome_ws.recv())
+
+    def _cdp_send(self, method, params=None):
+        """Send one CDP command and return its result payload"""
+        self._cdp_msg_id += 1
+        msg_id = self._cdp_msg_id
+        self._chrome_ws.send(json.dumps({
+            'id': msg_id,
+            'method': method,
+            'params': params or {}
+        }))
+        deadline = time.monotonic() + self.CDP_TIMEOUT
+        while True:
+            message = self._cdp_recv(deadline)
+            if message.get('id') == msg_id:
+                if 'error' in message:
+                    raise RuntimeError(f"CDP {method} failed: {message['error']}")
+                return message.get('result', {})
+            if 'method' in message:
+                # Event frame (e.g. Page.loadEventFired racing the
+                # navigate ack) — keep it for _cdp_wait_event
+                self._cdp_events.append(message)
+
+    def _cdp_wait_event(self, event_name):
+        """Block until the given CDP event arrives (or buffered copy)"""
+        for i, message in enumerate(self._cdp_events):
+            if message.get('method') == event_name:
+                del self._cdp_events[i]
+                return message.get('params', {})
+        deadline = time.monotonic() + self.CDP_TIMEOUT
+        while True:
+            message = self._cdp_recv(deadline)
+            if message.get('method') == event_name:
+                return message.get('params', {})
+
+    def convert_html_to_pdf(self, html_content, output_path):
+        """
+        Convert HTML content to a PDF file
+
+        Args:
+            html_content (str): Rendered HTML document
+            output_path (str): Destination PDF path
+
+        Returns:
+            str: Path to generated PDF, or None if conversion failed
+        """
+        if 'wkhtmltopdf' in self.available_methods:
+            result = self._convert_with_wkhtmltopdf(html_content, output_path)
+            if result:
+                return result
+
+        if 'chrome' in self.available_methods:
+            if WEBSOCKET_AVAILABLE:
+                result = self._convert_with_chrome_cdp(html_content, output_path)
+                if result:
+                    return result
+            result = self._convert_with_chrome(html_content, output_path)
+            if result:
+                return result
+
+        print("❌ HTML to PDF conversion failed: no engine succeeded")
+        return None
+
+    def _convert_with_wkhtmltopdf(self, html_content, output_path):
+        """Convert using wkhtmltopdf"""
+        try:
+            cmd = [
+                self.available_methods['wkhtmltopdf'],
+                '--encoding', 'utf-8',
+                '--page-size', 'A4',
+                '--margin-top', '20mm',
+                '--margin-bottom', '20mm',
+                '--margin-left', '20mm',
+                '--margin-right', '20mm',
+                '-', output_path
+            ]
+            # Engines can spew megabytes of font/resource noise on
+            # stderr; don't buffer it on the success path
+            subprocess.run(cmd, input=html_content.encode('utf-8'),
+                           stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=True)
+            return output_path
+        except subprocess.CalledProcessError as e:
+            print(f"⚠️  wkhtmltopdf error: exit code {e.returncode}")
+            return None
+
+    def _convert_with_chrome_cdp(self, html_content, output_path):
+        """Convert using the persistent Chrome DevTools session"""
+        html_path = None
+        try:
+            self._ensure_chrome_session()
+
+            fd, html_path = tempfile.mkstemp(suffix='.html')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(html_content)
+
+            # Drop any events left over from a previous navigation so a
+            # stale load event cannot satisfy this wait prematurely
+            self._cdp_events.clear()
+            self._cdp_send('Page.navigate',
+                           {'url': f'file://{os.path.abspath(html_path)}'})
+            self._cdp_wait_event('Page.loadEventFired')
+
+            result = self._cdp_send('Page.printToPDF', {
+                'printBackground': True,
+                'paperWidth': 8.27,   # A4 in inches
+                'paperHeight': 11.69
+            })
+            with open(output_path, 'wb') as f:
+                f.write(base64.b64decode(result['data']))
+            return output_path
+        except Exception as e:
+            print(f"⚠️  Chrome CDP error: {e}")
+            self.close()
+            return None
+        finally:
+            if html_path is not None:
+                try:
+                    os.unlink(html_path)
+                except OSError:
+                    pass
+
+    # Windows caps the whole command line at ~32K characters (and Linux
+    # at 128 KiB per argument), so data: URLs longer than this go
+    # through a temp file instead of argv
+    DATA_URL_ARGV_LIMIT = 30000
+
+    def _convert_with_chrome(self, html_content, output_path):
+        """Convert using headless Chrome"""
+        html_path = None
+        try:
+            # Hand the HTML over in-memory as a data: URL — no temp
+            # file creation/unlink syscalls per conversion — unless the
+            # document (embedded signature PNG, QR) is too large for
+            # the OS argument limits
+            data_url = ('data:text/html;base64,' +
+                        base64.b64encode(html_content.encode('utf-8')).decode())
+            if len(data_url) <= self.DATA_URL_ARGV_LIMIT:
+                url = data_url
+            else:
+                fd, html_path = tempfile.mkstemp(suffix='.html')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(html_content)
+                url = f'file://{os.path.abspath(html_path)}'
+            cmd = [
+                self.available_methods['chrome'],
+                *_CHROME_FLAGS,
+                f'--print-to-pdf={output_path}',
+                url
+            ]
+            subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=True)
+            return output_path
+        except subprocess.CalledProcessError as e:
+            print(f"⚠️  Chrome error: exit code {e.returncode}")
+            return None
+        finally:
+            if html_path is not None:
+                try:
+                    os.unlink(html_path)
+                except OSError:
+                    pass
+
+
+if __name__ == "__main__":
+    converter = HTMLToPDFConverter()
+    print(f"Available methods: {list(converter.available_methods)}")
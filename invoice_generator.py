@@ -4,30 +4,161 @@ Invoice Generator Script
 Generates invoices from HTML template with QR codes and Russian localization
 """
 
+import functools
 import os
 import qrcode
 import base64
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML, CSS
-from num2words import num2words
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from io import BytesIO
-import calendar
+
+from html_to_pdf import HTMLToPDFConverter
+
+# Russian month names in nominative case, indexed by month number - 1
+# (calendar.month_name is locale-dependent English — wrong for these
+# documents — and pulls in a module that is otherwise unused)
+_RU_MONTHS = (
+    'январь', 'февраль', 'март', 'апрель', 'май', 'июнь',
+    'июль', 'август', 'сентябрь', 'октябрь', 'ноябрь', 'декабрь'
+)
+
+# СПКР payload fields: (QR field name, payment_data key), in the order
+# mandated by ГОСТ Р 56042-2014
+_QR_FIELDS = (
+    ('Name', 'name'),
+    ('PersonalAcc', 'personal_acc'),
+    ('BankName', 'bank_name'),
+    ('BIC', 'bic'),
+    ('CorrespAcc', 'corresp_acc'),
+    ('PayeeINN', 'payee_inn'),
+    ('KPP', 'kpp'),
+    ('Sum', 'sum'),
+    ('Purpose', 'purpose'),
+)
+
+try:
+    # SIMD-accelerated base64 (SSSE3/AVX2 kernels); optional
+    from pybase64 import b64encode_as_string as _b64encode_str
+except ImportError:
+    def _b64encode_str(data):
+        return base64.b64encode(data).decode()
+
+try:
+    # Faster pure-Python QR encoder with direct SVG output (no PIL /
+    # PNG compression step); optional
+    import segno
+    SEGNO_AVAILABLE = True
+except ImportError:
+    SEGNO_AVAILABLE = False
+
+
+@functools.lru_cache(maxsize=4096)
+def _num2words_ru(n):
+    """Spell out an integer in Russian (memoized — recurring amounts
+    are the common case in batch runs)"""
+    # Deferred import so non-WeasyPrint backends can run without it
+    from num2words import num2words
+    return num2words(n, lang='ru')
+
+
+def _unit_forms(one, few, many):
+    """Build a declension lookup indexed by n % 100"""
+    forms = []
+    for n in range(100):
+        if n % 10 == 1 and n != 11:
+            forms.append(one)
+        elif n % 10 in (2, 3, 4) and n not in (12, 13, 14):
+            forms.append(few)
+        else:
+            forms.append(many)
+    return tuple(forms)
+
+
+# Currency unit declensions, precomputed so the hot path is one index
+# instead of a chain of modulo comparisons
+_RUBLE_UNITS = _unit_forms('рубль', 'рубля', 'рублей')
+_KOPECK_UNITS = _unit_forms('копейка', 'копейки', 'копеек')
+
+
+@functools.lru_cache(maxsize=128)
+def _qr_data_uri(qr_data):
+    """
+    Render a QR payload to a base64 PNG data URI (memoized)
+
+    Bank details are static per payee, so recurring payloads are common
+    in batch runs — cache hits skip QR encoding, PIL rasterization and
+    PNG compression entirely.
+    """
+    if SEGNO_AVAILABLE:
+        try:
+            qr = segno.make(qr_data, error='l', version=13, mode='byte')
+        except segno.DataOverflowError:
+            qr = segno.make(qr_data, error='l')
+        buffer = BytesIO()
+        qr.save(buffer, kind='svg', scale=6, border=4,
+                dark='black', light='white', xmldecl=False)
+        return f"data:image/svg+xml;base64,{_b64encode_str(buffer.getvalue())}"
+
+    # Version 13 at ECC L holds any realistic СПКР payload, so the
+    # fit-search across trial versions is skipped; overflow (unusually
+    # long purpose/name fields) falls back to the search. box_size 6
+    # keeps the PNG ~3x smaller than the old 10px modules.
+    qr = qrcode.QRCode(
+        version=13,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=6,
+        border=4,
+    )
+    qr.add_data(qr_data)
+    try:
+        qr.make(fit=False)
+    except qrcode.exceptions.DataOverflowError:
+        qr.make(fit=True)
+
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    qr_img.save(buffer, format='PNG')
+    qr_base64 = _b64encode_str(buffer.getvalue())
+
+    return f"data:image/png;base64,{qr_base64}"
 
 
 class InvoiceGenerator:
-    def __init__(self, template_dir="templates", output_dir="output"):
+    def __init__(self, template_dir="templates", output_dir="output", pdf_backend=None):
         """
         Initialize the invoice generator
-        
+
         Args:
             template_dir (str): Directory containing HTML templates
             output_dir (str): Directory for generated PDFs
+            pdf_backend: HTML-to-PDF converter to prefer over WeasyPrint
+                (default: HTMLToPDFConverter; detection is cached)
         """
         self.template_dir = template_dir
         self.output_dir = output_dir
-        self.jinja_env = Environment(loader=FileSystemLoader(template_dir))
-        
+
+        # auto_reload off: templates don't change at runtime, so skip
+        # the per-render stat() on the template file. The bytecode
+        # cache persists compiled templates to disk, so fresh processes
+        # (including pool workers) skip the parse/compile step.
+        os.makedirs('.jinja_cache', exist_ok=True)
+        self.jinja_env = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=FileSystemBytecodeCache('.jinja_cache'),
+            auto_reload=False,
+            cache_size=50
+        )
+
+        # Bind the compiled invoice template once; repeated generation
+        # then skips the get_template lookup entirely
+        self._template = self.jinja_env.get_template("invoice.html")
+
+        # Prefer an external engine (persistent Chrome / wkhtmltopdf)
+        # when one is installed; WeasyPrint re-initializes its font and
+        # CSS machinery on every write_pdf and stays as the fallback
+        self.pdf_backend = pdf_backend if pdf_backend is not None else HTMLToPDFConverter()
+
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
     
@@ -43,10 +174,10 @@ class InvoiceGenerator:
         """
         if date is None:
             date = datetime.now()
-        
-        yyyymm = int(f"{date.year}{date.month:02d}")
-        octal_number = oct(yyyymm)[2:]  # Remove '0o' prefix
-        return f"INV-{octal_number}"
+
+        # :o formats the int straight to octal — no intermediate
+        # string round-trip or oct() slice
+        return f"INV-{date.year * 100 + date.month:o}"
     
     def generate_qr_code(self, payment_data):
         """
@@ -58,39 +189,15 @@ class InvoiceGenerator:
         Returns:
             str: Base64 encoded QR code image
         """
-        # Format QR data according to СПКР standard
-        qr_data = (
-            f"ST00012|"
-            f"Name={payment_data.get('name', '')}|"
-            f"PersonalAcc={payment_data.get('personal_acc', '')}|"
-            f"BankName={payment_data.get('bank_name', '')}|"
-            f"BIC={payment_data.get('bic', '')}|"
-            f"CorrespAcc={payment_data.get('corresp_acc', '')}|"
-            f"PayeeINN={payment_data.get('payee_inn', '')}|"
-            f"KPP={payment_data.get('kpp', '')}|"
-            f"Sum={payment_data.get('sum', '')}|"
-            f"Purpose={payment_data.get('purpose', '')}"
+        # Format QR data according to СПКР standard. The ST00012 prefix
+        # declares UTF-8 payload encoding, which is what qrcode emits.
+        qr_data = 'ST00012|' + '|'.join(
+            f"{field}={payment_data.get(key, '')}" for field, key in _QR_FIELDS
         )
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        # Create QR code image
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64 for HTML embedding
-        buffer = BytesIO()
-        qr_img.save(buffer, format='PNG')
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
-        return f"data:image/png;base64,{qr_base64}"
+
+        # Identical payloads (same payee, sum and purpose) render the
+        # same image, so the actual encoding is memoized
+        return _qr_data_uri(qr_data)
     
     def sum_to_words_russian(self, amount):
         """
@@ -106,26 +213,15 @@ class InvoiceGenerator:
             # Split into rubles and kopecks
             rubles = int(amount)
             kopecks = int((amount - rubles) * 100)
-            
-            # Convert to words
-            rubles_words = num2words(rubles, lang='ru')
-            kopecks_words = num2words(kopecks, lang='ru') if kopecks > 0 else "ноль"
-            
-            # Add currency units with proper declension
-            if rubles % 10 == 1 and rubles % 100 != 11:
-                ruble_unit = "рубль"
-            elif rubles % 10 in [2, 3, 4] and rubles % 100 not in [12, 13, 14]:
-                ruble_unit = "рубля"
-            else:
-                ruble_unit = "рублей"
-            
-            if kopecks % 10 == 1 and kopecks % 100 != 11:
-                kopeck_unit = "копейка"
-            elif kopecks % 10 in [2, 3, 4] and kopecks % 100 not in [12, 13, 14]:
-                kopeck_unit = "копейки"
-            else:
-                kopeck_unit = "копеек"
-            
+
+            # Convert to words (memoized)
+            rubles_words = _num2words_ru(rubles)
+            kopecks_words = _num2words_ru(kopecks) if kopecks > 0 else "ноль"
+
+            # Currency units with proper declension via lookup tables
+            ruble_unit = _RUBLE_UNITS[rubles % 100]
+            kopeck_unit = _KOPECK_UNITS[kopecks % 100]
+
             result = f"{rubles_words.capitalize()} {ruble_unit}"
             if kopecks > 0:
                 result += f" {kopecks_words} {kopeck_unit}"
@@ -148,9 +244,12 @@ class InvoiceGenerator:
         Returns:
             str: Path to generated PDF file
         """
-        # Load template
-        template = self.jinja_env.get_template(template_name)
-        
+        # Load template (pre-compiled in __init__ for the default one)
+        if template_name == "invoice.html":
+            template = self._template
+        else:
+            template = self.jinja_env.get_template(template_name)
+
         # Prepare template data
         current_date = datetime.now()
         invoice_number = self.generate_invoice_number(current_date)
@@ -166,7 +265,7 @@ class InvoiceGenerator:
         context = {
             'invoice_number': invoice_number,
             'invoice_date': current_date.strftime('%d.%m.%Y'),
-            'current_month': calendar.month_name[current_date.month],
+            'current_month': _RU_MONTHS[current_date.month - 1],
             'current_year': current_date.year,
             'qr_code': qr_code_image,
             'amount_in_words': amount_in_words,
@@ -175,13 +274,82 @@ class InvoiceGenerator:
         
         # Render HTML
         html_content = template.render(context)
-        
+
         # Generate PDF
         pdf_filename = f"{invoice_number}_{current_date.strftime('%Y%m%d')}.pdf"
         pdf_path = os.path.join(self.output_dir, pdf_filename)
-        
-        HTML(string=html_content).write_pdf(pdf_path)
-        
+
+        result = None
+        if self.pdf_backend.available_methods:
+            result = self.pdf_backend.convert_html_to_pdf(html_content, pdf_path)
+
+        if result is None:
+            # Lazy import: pulling in GObject/Pango/Cairo costs hundreds
+            # of milliseconds and only the fallback path needs it. Also
+            # reached when the external backend failed, so a broken
+            # engine degrades to WeasyPrint instead of returning a path
+            # that was never written.
+            try:
+                from weasyprint import HTML
+                HTML(string=html_content).write_pdf(pdf_path)
+                result = pdf_path
+            except Exception as e:
+                print(f"❌ PDF generation failed: {e}")
+                return None
+
+        return result
+
+    def generate_invoices(self, invoices_data, template_name="invoice.html"):
+        """
+        Generate a batch of invoices as a single combined PDF
+
+        Rendering every invoice into one document amortizes the PDF
+        engine setup and serialization across the whole batch instead
+        of paying it once per invoice.
+
+        Args:
+            invoices_data (list): Invoice information dicts, one per invoice
+            template_name (str): Template filename
+
+        Returns:
+            str: Path to the combined PDF file, or None for an empty batch
+        """
+        if not invoices_data:
+            return None
+
+        from weasyprint import HTML  # lazy import, see generate_invoice
+
+        if template_name == "invoice.html":
+            template = self._template
+        else:
+            template = self.jinja_env.get_template(template_name)
+        current_date = datetime.now()
+
+        # Render each invoice to a WeasyPrint document, then emit all
+        # pages in one write — each invoice starts on its own page
+        documents = []
+        for invoice_data in invoices_data:
+            invoice_number = self.generate_invoice_number(current_date)
+            qr_code_image = self.generate_qr_code(invoice_data.get('payment_data', {}))
+            total_amount = invoice_data.get('total_amount', 0)
+
+            context = {
+                'invoice_number': invoice_number,
+                'invoice_date': current_date.strftime('%d.%m.%Y'),
+                'current_month': _RU_MONTHS[current_date.month - 1],
+                'current_year': current_date.year,
+                'qr_code': qr_code_image,
+                'amount_in_words': self.sum_to_words_russian(total_amount),
+                **invoice_data
+            }
+            html_content = template.render(context)
+            documents.append(HTML(string=html_content).render())
+
+        all_pages = [page for document in documents for page in document.pages]
+        pdf_filename = f"invoices_{current_date.strftime('%Y%m%d_%H%M%S')}.pdf"
+        pdf_path = os.path.join(self.output_dir, pdf_filename)
+        documents[0].copy(all_pages).write_pdf(pdf_path)
+
         return pdf_path
 
 
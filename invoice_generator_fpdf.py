@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Invoice Generator using fpdf2 (no HTML rendering engine)
+Writes PDF primitives directly — orders of magnitude faster than
+driving WeasyPrint or Chrome for this fixed tabular layout
+"""
+
+import os
+import qrcode
+from datetime import datetime
+from io import BytesIO
+
+try:
+    from fpdf import FPDF
+    FPDF_AVAILABLE = True
+except ImportError:
+    FPDF_AVAILABLE = False
+
+from invoice_generator import _RU_MONTHS, _QR_FIELDS  # noqa: F401
+
+# Unicode TTF candidates for Cyrillic output; the first one that
+# exists is registered, otherwise the core Helvetica font is used
+# (Latin-only, but the generator still works)
+FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    r'C:\Windows\Fonts\arial.ttf',
+)
+
+
+class InvoiceGeneratorFPDF:
+    def __init__(self, output_dir="output"):
+        """
+        Initialize the fpdf2 invoice generator
+
+        Args:
+            output_dir (str): Directory for generated PDFs
+        """
+        if not FPDF_AVAILABLE:
+            raise ImportError("fpdf2 is not installed (pip install fpdf2)")
+
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.font_path = next(
+            (path for path in FONT_CANDIDATES if os.path.isfile(path)), None)
+
+    def _setup_page(self, pdf):
+        """Add a page and register the Unicode font"""
+        pdf.add_page()
+        if self.font_path:
+            pdf.add_font('Invoice', '', self.font_path)
+            pdf.set_font('Invoice', '', 10)
+        else:
+            pdf.set_font('Helvetica', '', 10)
+
+    def generate_invoice_number(self, date=None):
+        """Generate invoice number using octal conversion of yyyymm"""
+        if date is None:
+            date = datetime.now()
+        return f"INV-{date.year * 100 + date.month:o}"
+
+    def _qr_png(self, payment_data):
+        """Render the СПКР payment QR code to a PNG buffer"""
+        qr_data = 'ST00012|' + '|'.join(
+            f"{field}={payment_data.get(key, '')}" for field, key in _QR_FIELDS
+        )
+        qr = qrcode.QRCode(
+            version=13,
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            box_size=6,
+            border=4,
+        )
+        qr.add_data(qr_data)
+        try:
+            qr.make(fit=False)
+        except qrcode.exceptions.DataOverflowError:
+            qr.make(fit=True)
+
+        buffer = BytesIO()
+        qr.make_image(fill_color="black", back_color="white").save(
+            buffer, format='PNG')
+        buffer.seek(0)
+        return buffer
+
+    def generate_invoice(self, invoice_data):
+        """
+        Generate invoice PDF with direct PDF primitives
+
+        Args:
+            invoice_data (dict): Invoice information (same shape as the
+                InvoiceGenerator sample data)
+
+        Returns:
+            str: Path to generated PDF file
+        """
+        current_date = datetime.now()
+        invoice_number = self.generate_invoice_number(current_date)
+
+        pdf = FPDF(format='A4')
+        pdf.set_margins(20, 20, 20)
+        self._setup_page(pdf)
+
+        # Header
+        pdf.set_font_size(18)
+        pdf.cell(0, 12, f"СЧЕТ № {invoice_number}", align='C',
+                 new_x='LMARGIN', new_y='NEXT')
+        pdf.set_font_size(10)
+        pdf.cell(0, 8, f"от {current_date.strftime('%d.%m.%Y')}", align='C',
+                 new_x='LMARGIN', new_y='NEXT')
+        pdf.ln(6)
+
+        # Parties
+        pdf.cell(0, 6, f"Поставщик: {invoice_data.get('company_name', '')}",
+                 new_x='LMARGIN', new_y='NEXT')
+        pdf.cell(0, 6, f"ИНН: {invoice_data.get('company_inn', '')}",
+                 new_x='LMARGIN', new_y='NEXT')
+        pdf.cell(0, 6, f"Покупатель: {invoice_data.get('client_name', '')}",
+                 new_x='LMARGIN', new_y='NEXT')
+        pdf.ln(6)
+
+        # Items table
+        col_widths = (10, 90, 20, 25, 25)
+        header = ('№', 'Наименование', 'Кол-во', 'Цена', 'Сумма')
+        for width, text in zip(col_widths, header):
+            pdf.cell(width, 8, text, border=1, align='C')
+        pdf.ln()
+        for i, item in enumerate(invoice_data.get('items', []), 1):
+            row = (
+                str(i),
+                item.get('description', ''),
+                str(item.get('quantity', '')),
+                f"{item.get('price', 0):,.2f}",
+                f"{item.get('total', 0):,.2f}",
+            )
+            for width, text in zip(col_widths, row):
+                pdf.cell(width, 8, text, border=1)
+            pdf.ln()
+        pdf.ln(4)
+
+        total_amount = invoice_data.get('total_amount', 0)
+        pdf.cell(0, 8, f"Всего к оплате: {total_amount:,.2f} руб.",
+                 new_x='LMARGIN', new_y='NEXT')
+        pdf.ln(4)
+
+        # Payment details next to the QR code
+        payment_data = invoice_data.get('payment_data', {})
+        qr_y = pdf.get_y()
+        pdf.image(self._qr_png(payment_data), x=150, y=qr_y, w=40, h=40)
+
+        details = (
+            f"Получатель: {payment_data.get('name', '')}",
+            f"Расчетный счет: {payment_data.get('personal_acc', '')}",
+            f"Банк: {payment_data.get('bank_name', '')}",
+            f"БИК: {payment_data.get('bic', '')}",
+            f"Корр. счет: {payment_data.get('corresp_acc', '')}",
+            f"ИНН: {payment_data.get('payee_inn', '')}",
+            f"Назначение: {payment_data.get('purpose', '')}",
+        )
+        for line in details:
+            pdf.cell(125, 6, line, new_x='LMARGIN', new_y='NEXT')
+
+        pdf_filename = f"{invoice_number}_{current_date.strftime('%Y%m%d')}.pdf"
+        pdf_path = os.path.join(self.output_dir, pdf_filename)
+        pdf.output(pdf_path)
+
+        return pdf_path
+
+
+if __name__ == "__main__":
+    generator = InvoiceGeneratorFPDF()
+
+    sample_data = {
+        'company_name': 'ООО "Ромашка"',
+        'company_inn': '7701234567',
+        'client_name': 'ООО "Клиент"',
+        'items': [
+            {'description': 'Услуга 1', 'quantity': 1, 'price': 50000, 'total': 50000},
+        ],
+        'total_amount': 50000,
+        'payment_data': {
+            'name': 'ООО "Ромашка"',
+            'personal_acc': '40702810900000000001',
+            'bank_name': 'АО "БАНК"',
+            'bic': '044525225',
+            'corresp_acc': '30101810400000000225',
+            'payee_inn': '7701234567',
+            'kpp': '770101001',
+            'sum': '50000',
+            'purpose': 'Оплата по счету'
+        }
+    }
+
+    try:
+        pdf_path = generator.generate_invoice(sample_data)
+        print(f"Invoice generated successfully: {pdf_path}")
+    except Exception as e:
+        print(f"Error generating invoice: {str(e)}")
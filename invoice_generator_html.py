@@ -4,15 +4,17 @@ HTML-based Invoice Generator that works with updated template
 Uses WeasyPrint for PDF generation with proper Unicode support
 """
 
+import functools
 import os
 import qrcode
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO
 from num2words import num2words
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 
-from act_generator import ActGenerator
+from act_generator import ActGenerator, _strip_screen_stylesheets
 from config import BANK_INFO, COMPANY_INFO
 
 try:
@@ -22,6 +24,99 @@ except (ImportError, OSError) as e:
     WEASYPRINT_AVAILABLE = False
     WEASYPRINT_ERROR = str(e)
 
+try:
+    # Much faster QR matrix construction than pure-python qrcode, and
+    # writes PNG without PIL; optional
+    import segno
+    SEGNO_AVAILABLE = True
+except ImportError:
+    SEGNO_AVAILABLE = False
+
+try:
+    # SIMD-accelerated base64 (SSSE3/AVX2 kernels); optional
+    from pybase64 import b64encode as _b64encode
+except ImportError:
+    _b64encode = base64.b64encode
+
+
+@functools.lru_cache(maxsize=256)
+def _build_qr_png(qr_string):
+    """
+    Encode a QR payload to PNG bytes (memoized)
+
+    The payload string fully determines the image, and recurring
+    payer/sum combinations are common, so cache hits skip the QR
+    matrix build and the PNG DEFLATE pass.
+    """
+    if SEGNO_AVAILABLE:
+        buffer = BytesIO()
+        segno.make(qr_string, error='l').save(buffer, kind='png',
+                                              scale=10, border=4)
+        return buffer.getvalue()
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(qr_string)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=256)
+def _build_qr_svg(qr_string):
+    """Encode a QR payload to SVG bytes (memoized)
+
+    WeasyPrint rasterizes images through its vector pipeline anyway, so
+    emitting SVG skips the PNG DEFLATE pass entirely and the embedded
+    base64 payload is a fraction of the raster size.
+    """
+    buffer = BytesIO()
+    segno.make(qr_string, error='l').save(buffer, kind='svg',
+                                          scale=10, border=4, xmldecl=False)
+    return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_font_config():
+    """
+    Build the WeasyPrint font configuration once per process.
+
+    Font discovery is one of the most expensive parts of a WeasyPrint
+    render; sharing one configuration across all PDFs in a batch pays
+    that cost a single time.
+    """
+    from weasyprint.text.fonts import FontConfiguration
+    return FontConfiguration()
+
+
+@functools.lru_cache(maxsize=4)
+def _get_environment(templates_dir):
+    """
+    Build (once per templates_dir) the shared Jinja2 environment.
+
+    auto_reload is off because templates don't change at runtime;
+    sharing the environment means repeated generator instantiations
+    (long-running bot, batches) compile each template only once. The
+    bytecode cache persists the compiled template across process
+    restarts, so CLI invocations skip lex/parse/compile entirely after
+    the first run.
+    """
+    os.makedirs('.jinja_cache', exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(templates_dir),
+        auto_reload=False,
+        cache_size=400,
+        bytecode_cache=FileSystemBytecodeCache('.jinja_cache')
+    )
+
 
 class InvoiceGeneratorHTML:
     def __init__(self, output_dir="output", templates_dir="templates"):
@@ -37,57 +132,80 @@ class InvoiceGeneratorHTML:
         
         os.makedirs(output_dir, exist_ok=True)
         
-        # Setup Jinja2 environment
-        self.env = Environment(loader=FileSystemLoader(templates_dir))
-        
+        # Setup Jinja2 environment (shared per templates_dir) and bind
+        # the compiled invoice template once
+        self.env = _get_environment(templates_dir)
+        self._invoice_template = self.env.get_template('invoice.html')
+
+        # Static payee part of the СПКР QR string, cached per payee so
+        # only Sum and Purpose are formatted per invoice
+        self._qr_prefix_cache = {}
+
+
         if not WEASYPRINT_AVAILABLE:
             print("⚠️  WeasyPrint not available. Only HTML output will be generated.")
             if 'WEASYPRINT_ERROR' in globals():
                 print(f"   Error: {WEASYPRINT_ERROR}")
     
-    def generate_qr_code(self, qr_data, invoice_number):
+    def generate_qr_code(self, qr_data, invoice_number, sum_kopecks=None,
+                         date_str=None):
         """
         Generate QR code according to СПКР standard
-        
+
         Args:
-            qr_data (dict): Payment data for QR generation
-            
+            qr_data (dict): Payment data for QR generation (read-only)
+            invoice_number (str): Invoice number for the Purpose field
+            sum_kopecks (int): Amount in kopecks; derived from
+                qr_data['sum'] rubles when not given
+            date_str (str): Invoice date as dd.mm.yyyy; defaults to
+                today. Callers that already hold the invoice timestamp
+                should pass it so QR and document agree on the date.
+
         Returns:
             str: Base64 encoded QR code image
         """
-        # Format according to СПКР (ГОСТ Р 56042-2014)
-        qr_data['sum'] = int(qr_data.get('sum', '')) * 100
-        qr_string = (
-            f"ST00012|"
-            f"Name={qr_data.get('name', '')}|"
-            f"PersonalAcc={qr_data.get('personal_acc', '')}|"
-            f"BankName={qr_data.get('bank_name', '')}|"
-            f"BIC={qr_data.get('bic', '')}|"
-            f"CorrespAcc={qr_data.get('corresp_acc', '')}|"
-            f"PayeeINN={qr_data.get('payee_inn', '')}|"
-            f"KPP={qr_data.get('kpp', '')}|"
-            f"Sum={qr_data.get('sum', '')}|"
-            f"Purpose=Оплата по счету №{invoice_number} от {datetime.now().strftime('%d.%m.%Y')}"
+        # СПКР wants the amount as integer kopecks; compute it locally
+        # instead of writing the converted value back into the caller's
+        # dict (repeat calls would multiply the amount by 100 again)
+        if sum_kopecks is None:
+            sum_kopecks = int(qr_data.get('sum', 0)) * 100
+        if date_str is None:
+            date_str = datetime.now().strftime('%d.%m.%Y')
+
+        # Format according to СПКР (ГОСТ Р 56042-2014). The payee block
+        # never changes between invoices for the same vendor, so it is
+        # formatted once and cached; only Sum and Purpose vary.
+        static_key = (
+            qr_data.get('name', ''),
+            qr_data.get('personal_acc', ''),
+            qr_data.get('bank_name', ''),
+            qr_data.get('bic', ''),
+            qr_data.get('corresp_acc', ''),
+            qr_data.get('payee_inn', ''),
+            qr_data.get('kpp', ''),
         )
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
+        qr_prefix = self._qr_prefix_cache.get(static_key)
+        if qr_prefix is None:
+            qr_prefix = (
+                "ST00012|Name={}|PersonalAcc={}|BankName={}|BIC={}|"
+                "CorrespAcc={}|PayeeINN={}|KPP={}".format(*static_key)
+            )
+            self._qr_prefix_cache[static_key] = qr_prefix
+
+        qr_string = (
+            f"{qr_prefix}|"
+            f"Sum={sum_kopecks}|"
+            f"Purpose=Оплата по счету №{invoice_number} от {date_str}"
         )
-        qr.add_data(qr_string)
-        qr.make(fit=True)
-        
-        # Create image
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
         
+        # Encode (memoized by payload) and embed as base64 — SVG when
+        # segno is available, raster PNG otherwise
+        if SEGNO_AVAILABLE:
+            svg_str = _b64encode(_build_qr_svg(qr_string)).decode()
+            return f"data:image/svg+xml;base64,{svg_str}"
+
+        img_str = _b64encode(_build_qr_png(qr_string)).decode()
+
         return f"data:image/png;base64,{img_str}"
     
     def convert_sum_to_words(self, amount):
@@ -182,62 +300,130 @@ class InvoiceGeneratorHTML:
         Returns:
             str: Path to generated PDF
         """
+        filename, html_content = self._prepare_html(invoice_data)
+
+
+        # Try the PDF first — the HTML file is written only when
+        # explicitly requested or as a failure fallback, so the happy
+        # path skips one filesystem round-trip per invoice
+        from config import PDF_CONFIG
+        pdf_path = os.path.join(self.output_dir, f"{filename}.pdf")
+
+        if WEASYPRINT_AVAILABLE:
+            try:
+                # Use WeasyPrint to generate PDF (shared font config —
+                # font discovery is paid once per process, not per PDF).
+                # Screen-only stylesheets are dead weight for the PDF
+                # pass; the HTML preview keeps them.
+                weasyprint.HTML(string=_strip_screen_stylesheets(html_content),
+                                base_url=self.templates_dir).write_pdf(
+                    pdf_path, font_config=_get_font_config())
+                print(f"✅ PDF generated with WeasyPrint: {pdf_path}")
+                if PDF_CONFIG.get('generate_html', True):
+                    self._write_html(filename, html_content)
+                return pdf_path
+            except Exception as e:
+                print(f"❌ WeasyPrint error: {e}")
+
+        # Fallback - keep the HTML so a PDF can be produced manually
+        html_path = self._write_html(filename, html_content)
+        print(f"📄 HTML generated: {html_path}")
+        print("💡 To create PDF manually:")
+        print("   1. Open the HTML file in a web browser")
+        print("   2. Press Ctrl+P (Print)")
+        print("   3. Choose 'Save as PDF' as destination")
+        print("   4. Set margins to 'Custom' with 0.75 inches on all sides")
+        print("   5. Save the PDF")
+        return html_path
+
+    def _prepare_html(self, invoice_data):
+        """Fill in derived invoice fields and render the HTML
+
+        Returns:
+            tuple: (base filename without extension, rendered HTML)
+        """
         # Generate invoice number if not provided
         now = datetime.now()
         invoice_data['invoice']['number'] = self.generate_octal_invoice_number(now.year, now.month)
-        
+
         # Generate QR code
         if 'qr_code_data' in invoice_data:
-            invoice_data['qr_code_data_uri'] = self.generate_qr_code(invoice_data['qr_code_data'], invoice_data['invoice']['number'])
-        
+            invoice_data['qr_code_data_uri'] = self.generate_qr_code(
+                invoice_data['qr_code_data'], invoice_data['invoice']['number'],
+                date_str=now.strftime('%d.%m.%Y'))
+
         # Convert amount to words
         if 'total' in invoice_data['totals']:
             invoice_data['totals']['total_in_words'] = self.convert_sum_to_words(invoice_data['totals']['total'])
-        
+
         # Remove qr_code_data from invoice_data to match invoice.html structure
         invoice_data.pop('qr_code_data')
-        
-        # Load and render template
-        template = self.env.get_template('invoice.html')
-        html_content = template.render(**invoice_data)
-        
-        # Generate filename with timestamp to avoid conflicts
-        invoice_num = invoice_data['invoice']['number']
-        filename = f"invoice_{invoice_num}"
-        
-        # Save HTML only if configured to do so
-        from config import PDF_CONFIG
-        html_path = None
-        if PDF_CONFIG.get('generate_html', True):
-            html_path = os.path.join(self.output_dir, f"{filename}.html")
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-        
-        # Try to generate PDF
-        pdf_path = os.path.join(self.output_dir, f"{filename}.pdf")
-        
-        if WEASYPRINT_AVAILABLE:
+
+        # Render the pre-compiled template
+        html_content = self._invoice_template.render(**invoice_data)
+
+        filename = f"invoice_{invoice_data['invoice']['number']}"
+        return filename, html_content
+
+    def _write_html(self, filename, html_content):
+        """Write the rendered HTML next to the PDF output"""
+        html_path = os.path.join(self.output_dir, f"{filename}.html")
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        return html_path
+
+    def generate_invoices_batch(self, invoices):
+        """
+        Generate PDFs for a batch of invoices in one process pass
+
+        The compiled template, Jinja environment and WeasyPrint font
+        configuration are all shared, and the PDFs are rendered to
+        memory with the disk writes overlapped in a small thread pool,
+        so N renders pay roughly one write latency instead of N.
+
+        Args:
+            invoices (list): Invoice data dicts, one per invoice
+
+        Returns:
+            list: Paths to generated files, in input order (None on failure)
+        """
+        if not WEASYPRINT_AVAILABLE:
+            return [self.generate_invoice(invoice_data) for invoice_data in invoices]
+
+        font_config = _get_font_config()
+        rendered = []
+        used_paths = set()
+        for invoice_data in invoices:
             try:
-                # Use WeasyPrint to generate PDF
-                weasyprint.HTML(string=html_content, base_url=self.templates_dir).write_pdf(pdf_path)
-                print(f"✅ PDF generated with WeasyPrint: {pdf_path}")
-                return pdf_path
+                filename, html_content = self._prepare_html(invoice_data)
+                pdf_path = os.path.join(self.output_dir, f"{filename}.pdf")
+                # Same-month invoices share an octal number; suffix
+                # duplicates so the batch doesn't overwrite itself
+                suffix = 1
+                while pdf_path in used_paths:
+                    pdf_path = os.path.join(self.output_dir, f"{filename}_{suffix}.pdf")
+                    suffix += 1
+                used_paths.add(pdf_path)
+
+                pdf_bytes = weasyprint.HTML(
+                    string=_strip_screen_stylesheets(html_content),
+                    base_url=self.templates_dir
+                ).write_pdf(font_config=font_config)
+                rendered.append((pdf_path, pdf_bytes))
             except Exception as e:
                 print(f"❌ WeasyPrint error: {e}")
-        
-        # Fallback - if HTML is disabled and PDF failed, return None
-        if html_path:
-            print(f"📄 HTML generated: {html_path}")
-            print("💡 To create PDF manually:")
-            print("   1. Open the HTML file in a web browser")
-            print("   2. Press Ctrl+P (Print)")
-            print("   3. Choose 'Save as PDF' as destination")
-            print("   4. Set margins to 'Custom' with 0.75 inches on all sides")
-            print("   5. Save the PDF")
-            return html_path
-        else:
-            print("❌ PDF generation failed and HTML generation is disabled")
-            return None
+                rendered.append(None)
+
+        def _write(item):
+            if item is None:
+                return None
+            path, data = item
+            with open(path, 'wb') as f:
+                f.write(data)
+            return path
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(_write, rendered))
 
 
 def main():
@@ -273,16 +459,17 @@ def main():
         }
     }
     
-    # Check for signature file
+    # Check for signature file (EAFP: open directly, no stat beforehand)
     sig_path = 'signatures/YL_Signature.png'
-    if os.path.exists(sig_path):
-        try:
-            with open(sig_path, 'rb') as f:
-                sig_data = base64.b64encode(f.read()).decode()
-                invoice_data['signatures']['director'] = sig_data
-                print("✅ Signature loaded")
-        except Exception as e:
-            print(f"⚠️  Could not load signature: {e}")
+    try:
+        with open(sig_path, 'rb') as f:
+            sig_data = _b64encode(f.read()).decode()
+            invoice_data['signatures']['director'] = sig_data
+            print("✅ Signature loaded")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️  Could not load signature: {e}")
     
     # Generate invoice
     result = generator.generate_invoice(invoice_data)
@@ -4,22 +4,249 @@ Alternative Invoice Generator using ReportLab (Windows-friendly)
 Generates invoices without external dependencies
 """
 
+import collections
+import functools
 import os
 import qrcode
 import base64
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from io import BytesIO
+from pathlib import Path
 from num2words import num2words
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib.enums import TA_CENTER
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+try:
+    # Much faster QR matrix construction than pure-python qrcode, and
+    # writes PNG without PIL; optional
+    import segno
+    SEGNO_AVAILABLE = True
+except ImportError:
+    SEGNO_AVAILABLE = False
+
+try:
+    # SIMD-accelerated base64 (SSSE3/AVX2 kernels); optional
+    from pybase64 import b64decode as _b64decode
+except ImportError:
+    _b64decode = base64.b64decode
+
+@functools.lru_cache(maxsize=256)
+def _build_qr_png(qr_string):
+    """Encode a QR payload to PNG bytes (memoized — the payload string
+    fully determines the image, and repeat payers recur in batches)"""
+    if SEGNO_AVAILABLE:
+        buffer = BytesIO()
+        segno.make(qr_string, error='l').save(buffer, kind='png', scale=10, border=4)
+        return buffer.getvalue()
+
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(qr_string)
+    qr.make(fit=True)
+
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = BytesIO()
+    qr_img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+# Shared style sheet, built once at import: getSampleStyleSheet()
+# parses the builtin font metrics, which is too expensive to repeat on
+# every generator instantiation. The guard keeps re-imports (and the
+# stylesheet's no-duplicate-name rule) safe.
+_STYLES = getSampleStyleSheet()
+if 'CustomTitle' not in _STYLES:
+    _STYLES.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=_STYLES['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.black
+    ))
+    _STYLES.add(ParagraphStyle(
+        name='CompanyInfo',
+        parent=_STYLES['Normal'],
+        fontSize=10,
+        spaceAfter=6,
+        leftIndent=0
+    ))
+    _STYLES.add(ParagraphStyle(
+        name='Highlight',
+        parent=_STYLES['Normal'],
+        fontSize=12,
+        textColor=colors.black,
+        backColor=colors.yellow,
+        leftIndent=6,
+        rightIndent=6,
+        spaceAfter=6,
+        spaceBefore=6
+    ))
+
+# Static story fragments shared by every invoice: header rows, table
+# styles and signature captions never change, so they are built once at
+# import instead of being re-allocated inside generate_invoice
+_ITEMS_HEADER = ('№', 'Наименование товара, работ, услуг', 'Кол-во', 'Цена', 'Сумма')
+
+_COMPANY_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+_ITEMS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (1, 1), (1, -1), 'LEFT'),
+    ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BACKGROUND', (4, 1), (4, -1), colors.yellow),  # Highlight totals
+])
+
+_TOTALS_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BACKGROUND', (1, 0), (1, -1), colors.yellow),  # Highlight amounts
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+_PAYMENT_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ALIGN', (1, 0), (1, 0), 'CENTER'),
+])
+
+_SIGNATURE_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('VALIGN', (0, 0), (-1, -1), 'BOTTOM'),
+])
+
+_FONTS_REGISTERED = False
+_FONT_NAME = 'Times-Roman'
+_FONT_BOLD = 'Times-Bold'
+
+
+def _register_fonts_once():
+    """Resolve Cyrillic-capable fonts once per process"""
+    global _FONTS_REGISTERED, _FONT_NAME, _FONT_BOLD
+    if _FONTS_REGISTERED:
+        return
+    try:
+        # These fonts should support Cyrillic if available on system
+        from reportlab.lib.fonts import addMapping  # noqa: F401
+        _FONT_NAME = 'Times-Roman'
+        _FONT_BOLD = 'Times-Bold'
+    except Exception:
+        # Use default fonts
+        _FONT_NAME = 'Times-Roman'
+        _FONT_BOLD = 'Times-Bold'
+    _FONTS_REGISTERED = True
+
+
+# СПКР (ГОСТ Р 56042-2014) payload template, compiled to opcodes once
+# at import; format_map fills it in a single pass with no intermediate
+# f-string concatenations
+_QR_FMT = (
+    "ST00012|Name={name}|PersonalAcc={personal_acc}|BankName={bank_name}|"
+    "BIC={bic}|CorrespAcc={corresp_acc}|PayeeINN={payee_inn}|KPP={kpp}|"
+    "Sum={sum}|Purpose={purpose}"
+)
+
+
+# Lazily-built lookup of 0-999 spelled out in Russian; together with
+# the scale words below it lets sum_to_words_russian compose any
+# amount from dict hits instead of re-running num2words recursion
+_RU_WORDS = {}
+
+# Scale words by group position, with singular/few/many declensions
+_RU_SCALES = (
+    None,
+    ('тысяча', 'тысячи', 'тысяч'),
+    ('миллион', 'миллиона', 'миллионов'),
+    ('миллиард', 'миллиарда', 'миллиардов'),
+)
+
+
+def _unit_forms(one, few, many):
+    """Build a 100-entry declension table indexed by amount % 100"""
+    forms = []
+    for i in range(100):
+        if i % 10 == 1 and i != 11:
+            forms.append(one)
+        elif i % 10 in (2, 3, 4) and i not in (12, 13, 14):
+            forms.append(few)
+        else:
+            forms.append(many)
+    return tuple(forms)
+
+
+# Currency-unit declensions precomputed for the last two digits, so
+# picking "рубль/рубля/рублей" is a single index instead of a branch
+# ladder per call
+_RU_RUB = _unit_forms('рубль', 'рубля', 'рублей')
+_RU_KOP = _unit_forms('копейка', 'копейки', 'копеек')
+
+
+def _plural_index(n):
+    """Pick the Russian declension slot (singular/few/many) for n"""
+    if n % 10 == 1 and n % 100 != 11:
+        return 0
+    if n % 10 in (2, 3, 4) and n % 100 not in (12, 13, 14):
+        return 1
+    return 2
+
+
+def _group_words(n, feminine=False):
+    """Spell a 0-999 group, optionally in feminine form (for тысячи)"""
+    words = _RU_WORDS.get(n)
+    if words is None:
+        words = num2words(n, lang='ru')
+        _RU_WORDS[n] = words
+    if feminine:
+        tokens = words.split()
+        if tokens[-1] == 'один':
+            tokens[-1] = 'одна'
+        elif tokens[-1] == 'два':
+            tokens[-1] = 'две'
+        words = ' '.join(tokens)
+    return words
+
+
+def _int_to_words_ru(n):
+    """Spell out a non-negative integer in Russian via the group LUT"""
+    if n == 0:
+        return _group_words(0)
+
+    groups = []
+    scale_index = 0
+    while n:
+        n, group = divmod(n, 1000)
+        groups.append((scale_index, group))
+        scale_index += 1
+
+    parts = []
+    for scale_index, group in reversed(groups):
+        if group == 0:
+            continue
+        parts.append(_group_words(group, feminine=(scale_index == 1)))
+        if scale_index:
+            parts.append(_RU_SCALES[scale_index][_plural_index(group)])
+    return ' '.join(parts)
+
 
 class InvoiceGeneratorReportLab:
     def __init__(self, output_dir="output"):
@@ -31,57 +258,14 @@ class InvoiceGeneratorReportLab:
         """
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
-        
-        # Try to register Russian-compatible fonts
-        self.setup_fonts()
-        
-        # Setup styles
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
-    
-    def setup_fonts(self):
-        """Try to setup fonts that support Russian characters"""
-        try:
-            # These fonts should support Cyrillic if available on system
-            from reportlab.lib.fonts import addMapping
-            self.font_name = 'Times-Roman'  # Fallback
-            self.font_bold = 'Times-Bold'
-        except Exception:
-            # Use default fonts
-            self.font_name = 'Times-Roman'
-            self.font_bold = 'Times-Bold'
-    
-    def setup_custom_styles(self):
-        """Setup custom paragraph styles"""
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.black
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='CompanyInfo',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            leftIndent=0
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='Highlight',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            textColor=colors.black,
-            backColor=colors.yellow,
-            leftIndent=6,
-            rightIndent=6,
-            spaceAfter=6,
-            spaceBefore=6
-        ))
-    
+
+        # Fonts and styles are shared module-wide; repeated instances
+        # (batch workers, per-request construction) reuse them for free
+        _register_fonts_once()
+        self.font_name = _FONT_NAME
+        self.font_bold = _FONT_BOLD
+        self.styles = _STYLES
+
     def generate_invoice_number(self, date=None):
         """Generate invoice number using octal conversion of yyyymm"""
         if date is None:
@@ -93,32 +277,12 @@ class InvoiceGeneratorReportLab:
     
     def generate_qr_code(self, payment_data):
         """Generate QR code compliant with СПКР (ГОСТ Р 56042-2014)"""
-        qr_data = (
-            f"ST00012|"
-            f"Name={payment_data.get('name', '')}|"
-            f"PersonalAcc={payment_data.get('personal_acc', '')}|"
-            f"BankName={payment_data.get('bank_name', '')}|"
-            f"BIC={payment_data.get('bic', '')}|"
-            f"CorrespAcc={payment_data.get('corresp_acc', '')}|"
-            f"PayeeINN={payment_data.get('payee_inn', '')}|"
-            f"KPP={payment_data.get('kpp', '')}|"
-            f"Sum={payment_data.get('sum', '')}|"
-            f"Purpose={payment_data.get('purpose', '')}"
-        )
-        
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
+        # defaultdict(str) makes missing keys render as '' just like the
+        # old per-field .get(key, '') calls did
+        qr_data = _QR_FMT.format_map(collections.defaultdict(str, payment_data))
         
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Save to BytesIO for ReportLab
-        buffer = BytesIO()
-        qr_img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        return buffer
+        # Encode (memoized by payload) into a BytesIO for ReportLab
+        return BytesIO(_build_qr_png(qr_data))
     
     def create_signature_image(self, signature_base64):
         """
@@ -138,7 +302,7 @@ class InvoiceGeneratorReportLab:
                 base64_data = signature_base64
             
             # Decode base64
-            img_data = base64.b64decode(base64_data)
+            img_data = _b64decode(base64_data)
             img_buffer = BytesIO(img_data)
             
             # Create ReportLab Image
@@ -155,23 +319,12 @@ class InvoiceGeneratorReportLab:
             rubles = int(amount)
             kopecks = int((amount - rubles) * 100)
             
-            rubles_words = num2words(rubles, lang='ru')
-            kopecks_words = num2words(kopecks, lang='ru') if kopecks > 0 else "ноль"
-            
-            if rubles % 10 == 1 and rubles % 100 != 11:
-                ruble_unit = "рубль"
-            elif rubles % 10 in [2, 3, 4] and rubles % 100 not in [12, 13, 14]:
-                ruble_unit = "рубля"
-            else:
-                ruble_unit = "рублей"
-            
-            if kopecks % 10 == 1 and kopecks % 100 != 11:
-                kopeck_unit = "копейка"
-            elif kopecks % 10 in [2, 3, 4] and kopecks % 100 not in [12, 13, 14]:
-                kopeck_unit = "копейки"
-            else:
-                kopeck_unit = "копеек"
+            rubles_words = _int_to_words_ru(rubles)
+            kopecks_words = _int_to_words_ru(kopecks) if kopecks > 0 else "ноль"
             
+            ruble_unit = _RU_RUB[rubles % 100]
+            kopeck_unit = _RU_KOP[kopecks % 100]
+
             result = f"{rubles_words.capitalize()} {ruble_unit}"
             if kopecks > 0:
                 result += f" {kopecks_words} {kopeck_unit}"
@@ -182,18 +335,8 @@ class InvoiceGeneratorReportLab:
         except Exception as e:
             return f"Ошибка конвертации: {str(e)}"
     
-    def generate_invoice(self, invoice_data):
-        """Generate invoice PDF using ReportLab"""
-        current_date = datetime.now()
-        invoice_number = self.generate_invoice_number(current_date)
-        
-        # Create PDF
-        pdf_filename = f"{invoice_number}_{current_date.strftime('%Y%m%d')}.pdf"
-        pdf_path = os.path.join(self.output_dir, pdf_filename)
-        
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, 
-                               topMargin=2*cm, bottomMargin=2*cm)
-        
+    def _build_story(self, invoice_data, current_date, invoice_number):
+        """Build the flowable list for one invoice"""
         # Story (content) list
         story = []
         
@@ -218,39 +361,29 @@ class InvoiceGeneratorReportLab:
         ]
         
         company_table = Table(company_data, colWidths=[3*cm, 12*cm])
-        company_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        company_table.setStyle(_COMPANY_TABLE_STYLE)
         story.append(company_table)
         story.append(Spacer(1, 20))
         
-        # Items table
-        items_data = [['№', 'Наименование товара, работ, услуг', 'Кол-во', 'Цена', 'Сумма']]
-        
+        # Items table. The loop is the hot path for long invoices:
+        # bind .append once, read each field once, and use format()
+        # directly instead of re-parsing an f-string spec per cell
+        items_data = [_ITEMS_HEADER]
+        append_row = items_data.append
+
         for i, item in enumerate(invoice_data.get('items', []), 1):
-            items_data.append([
+            price = item.get('price', 0)
+            total = item.get('total', 0)
+            append_row((
                 str(i),
                 item.get('description', ''),
                 str(item.get('quantity', '')),
-                f"{item.get('price', 0):,.2f}",
-                f"{item.get('total', 0):,.2f}"
-            ])
+                format(price, ',.2f'),
+                format(total, ',.2f'),
+            ))
         
         items_table = Table(items_data, colWidths=[1*cm, 8*cm, 2*cm, 3*cm, 3*cm])
-        items_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-            ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (4, 1), (4, -1), colors.yellow),  # Highlight totals
-        ]))
+        items_table.setStyle(_ITEMS_TABLE_STYLE)
         story.append(items_table)
         story.append(Spacer(1, 20))
         
@@ -262,14 +395,7 @@ class InvoiceGeneratorReportLab:
         ]
         
         totals_table = Table(totals_data, colWidths=[8*cm, 4*cm])
-        totals_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.yellow),  # Highlight amounts
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
+        totals_table.setStyle(_TOTALS_TABLE_STYLE)
         story.append(totals_table)
         story.append(Spacer(1, 20))
         
@@ -299,10 +425,7 @@ class InvoiceGeneratorReportLab:
         payment_para = Paragraph(payment_text, self.styles['Normal'])
         
         payment_table = Table([[payment_para, qr_image]], colWidths=[12*cm, 5*cm])
-        payment_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('ALIGN', (1, 0), (1, 0), 'CENTER'),
-        ]))
+        payment_table.setStyle(_PAYMENT_TABLE_STYLE)
         story.append(payment_table)
         story.append(Spacer(1, 30))
         
@@ -346,18 +469,106 @@ class InvoiceGeneratorReportLab:
             signature_data = [['Руководитель', '_' * 30, 'Главный бухгалтер', '_' * 30]]
             signature_table = Table(signature_data, colWidths=[3*cm, 5*cm, 3*cm, 5*cm])
         
-        signature_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'BOTTOM'),
-        ]))
+        signature_table.setStyle(_SIGNATURE_TABLE_STYLE)
         story.append(signature_table)
-        
+
+        return story
+
+    def generate_invoice(self, invoice_data):
+        """Generate invoice PDF using ReportLab"""
+        current_date = datetime.now()
+        invoice_number = self.generate_invoice_number(current_date)
+
+        # Create PDF
+        pdf_filename = f"{invoice_number}_{current_date.strftime('%Y%m%d')}.pdf"
+        pdf_path = os.path.join(self.output_dir, pdf_filename)
+
+        # Render into memory and flush with a single write: ReportLab
+        # issues many small write() calls when given a file path
+        buf = BytesIO()
+        doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm,
+                               topMargin=2*cm, bottomMargin=2*cm)
+
         # Build PDF
+        doc.build(self._build_story(invoice_data, current_date, invoice_number))
+        Path(pdf_path).write_bytes(buf.getvalue())
+        return pdf_path
+
+    def generate_invoices_batch(self, invoice_datas, pdf_path=None):
+        """
+        Generate one multi-page PDF containing several invoices
+
+        One SimpleDocTemplate build amortizes document setup across the
+        whole batch, and the shared module-level styles mean only the
+        per-invoice cells are allocated inside the loop.
+
+        Args:
+            invoice_datas (list): Invoice data dicts, one per invoice
+            pdf_path (str): Destination path (default: batch_<date>.pdf
+                in the output directory)
+
+        Returns:
+            str: Path to the combined PDF file
+        """
+        current_date = datetime.now()
+        invoice_number = self.generate_invoice_number(current_date)
+
+        if pdf_path is None:
+            pdf_filename = f"batch_{current_date.strftime('%Y%m%d')}.pdf"
+            pdf_path = os.path.join(self.output_dir, pdf_filename)
+
+        story = []
+        for i, invoice_data in enumerate(invoice_datas):
+            if i:
+                story.append(PageBreak())
+            story.extend(self._build_story(invoice_data, current_date, invoice_number))
+
+        buf = BytesIO()
+        doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm,
+                               topMargin=2*cm, bottomMargin=2*cm)
         doc.build(story)
+        Path(pdf_path).write_bytes(buf.getvalue())
         return pdf_path
 
 
+def _render_one(invoice_data, output_dir):
+    """Render a single invoice in a worker process (must be picklable)"""
+    generator = InvoiceGeneratorReportLab(output_dir=output_dir)
+    return generator.generate_invoice(invoice_data)
+
+
+def batch_generate_invoices(invoice_datas, output_dir="output", max_workers=None):
+    """
+    Generate many invoices in parallel worker processes
+
+    ReportLab rendering is CPU-bound and each invoice is independent,
+    so a process pool gives near-linear speedup on multi-core machines.
+    Each worker builds its own generator; no state is shared.
+
+    Args:
+        invoice_datas (list): Invoice data dicts, one per invoice
+        output_dir (str): Directory for generated PDFs
+        max_workers (int): Worker count (default: min(cpu_count, 4))
+
+    Returns:
+        list: Paths to generated PDFs, in input order (None on failure)
+    """
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, 4)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_render_one, data, output_dir)
+                   for data in invoice_datas]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error generating invoice: {e}")
+                results.append(None)
+    return results
+
+
 if __name__ == "__main__":
     # Example usage
     generator = InvoiceGeneratorReportLab()
@@ -4,15 +4,67 @@ Setup script for Invoice Generator
 Handles installation and configuration
 """
 
+import importlib.util
 import os
+import re
 import sys
 import subprocess
 from pathlib import Path
 
+# Distributions whose import name differs from the pip name
+IMPORT_NAMES = {
+    'python-telegram-bot': 'telegram',
+    'python-dotenv': 'dotenv',
+    'pillow': 'PIL',
+}
+
+# Modules pulled in by known extras, probed alongside the base package
+EXTRA_IMPORT_NAMES = {
+    ('python-telegram-bot', 'webhooks'): ['tornado'],
+    ('qrcode', 'pil'): ['PIL'],
+}
+
+def required_modules(requirements_file):
+    """
+    Derive importable module names from a requirements file
+
+    Args:
+        requirements_file (str): Path to the requirements file
+
+    Returns:
+        list: Module names for importlib probing; empty when the file
+            is unreadable or contains an extra this map doesn't know,
+            in which case the caller should let pip decide
+    """
+    modules = []
+    try:
+        with open(requirements_file, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                match = re.match(r'([A-Za-z0-9._-]+)(?:\[([^\]]+)\])?', line)
+                if not match:
+                    return []
+                name = match.group(1).lower()
+                modules.append(IMPORT_NAMES.get(name, name.replace('-', '_')))
+                for extra in (match.group(2) or '').split(','):
+                    extra = extra.strip().lower()
+                    if not extra:
+                        continue
+                    extra_modules = EXTRA_IMPORT_NAMES.get((name, extra))
+                    if extra_modules is None:
+                        # Unknown extra — cannot verify it in-process
+                        return []
+                    modules.extend(extra_modules)
+    except OSError:
+        pass
+    return modules
+
 def install_dependencies():
     """Install required Python packages"""
     print("Installing dependencies...")
-    
+
     # Determine which requirements file to use
     if sys.platform.startswith('win'):
         requirements_file = 'requirements_windows.txt'
@@ -20,7 +72,15 @@ def install_dependencies():
     else:
         requirements_file = 'requirements.txt'
         print("Detected Unix/Linux - using WeasyPrint backend")
-    
+
+    # Skip spawning pip (seconds of interpreter start + resolver work)
+    # when every package the requirements file pins is already
+    # importable
+    modules = required_modules(requirements_file)
+    if modules and all(importlib.util.find_spec(m) for m in modules):
+        print("✓ Dependencies already installed")
+        return True
+
     try:
         subprocess.run([
             sys.executable, '-m', 'pip', 'install', '-r', requirements_file
@@ -8,19 +8,19 @@ import os
 import shutil
 
 
-def create_env_file():
+def create_env_file(present):
     """Create .env file from template if it doesn't exist"""
     env_file = '.env'
     template_file = 'env.template'
-    
-    if os.path.exists(env_file):
+
+    if env_file in present:
         print(f"✅ {env_file} already exists")
         return False
-    
-    if not os.path.exists(template_file):
+
+    if template_file not in present:
         print(f"❌ {template_file} not found")
         return False
-    
+
     # Copy template to .env
     shutil.copy2(template_file, env_file)
     print(f"✅ Created {env_file} from {template_file}")
@@ -30,7 +30,7 @@ def create_env_file():
 def check_signature_file():
     """Check if signature file exists"""
     signature_path = 'signatures/YL_Signature.png'
-    
+
     if os.path.exists(signature_path):
         print(f"✅ Signature file exists: {signature_path}")
         return True
@@ -75,15 +75,19 @@ def print_configuration_guide():
 def main():
     """Main setup function"""
     print("🔧 Setting up Telegram Bot...")
-    
+
+    # One directory listing answers every "does this file exist" check
+    # below, instead of a stat syscall per file
+    present = {entry.name for entry in os.scandir('.')}
+
     # Create .env file
-    env_created = create_env_file()
-    
+    env_created = create_env_file(present)
+
     # Check signature
     check_signature_file()
-    
+
     # Check bot storage
-    if not os.path.exists('bot_data.json'):
+    if 'bot_data.json' not in present:
         print("ℹ️  bot_data.json will be created automatically on first run")
     else:
         print("✅ bot_data.json exists")
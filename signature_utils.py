@@ -4,12 +4,123 @@ Digital signature utilities for Invoice Generator
 Supports both image signatures and digital certificates
 """
 
+import binascii
+import functools
+import hashlib
 import os
+import struct
+import zlib
 from pathlib import Path
 from PIL import Image
-import base64
 from io import BytesIO
 
+try:
+    # ~4-5x faster than md5/sha1 for cache-key hashing; optional
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+
+def _cache_key_digest(data):
+    """Hex digest for cache keys — BLAKE3 when installed, sha1 otherwise"""
+    if BLAKE3_AVAILABLE:
+        return blake3.blake3(data).hexdigest(length=16)
+    return hashlib.sha1(data).hexdigest()
+
+
+def _png_chunk(chunk_type, payload):
+    """Assemble one PNG chunk (length, type, payload, CRC)"""
+    return (struct.pack('>I', len(payload)) + chunk_type + payload +
+            struct.pack('>I', zlib.crc32(chunk_type + payload)))
+
+
+@functools.lru_cache(maxsize=8)
+def _transparent_png(width, height):
+    """
+    Build a fully transparent RGBA PNG of the given size
+
+    A transparent placeholder is just deflated zeros, so it can be
+    assembled directly from IHDR/IDAT/IEND chunks — no PIL image
+    object, encoder setup, or BytesIO round-trip.
+    """
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    # Each row: filter byte 0 + width RGBA pixels, all zero
+    idat = zlib.compress(b'\x00' * ((1 + width * 4) * height), 9)
+    return (b'\x89PNG\r\n\x1a\n' +
+            _png_chunk(b'IHDR', ihdr) +
+            _png_chunk(b'IDAT', idat) +
+            _png_chunk(b'IEND', b''))
+
+
+def _png_data_url(png_bytes):
+    """Wrap PNG bytes in a base64 data URL.
+
+    binascii.b2a_base64 is the C primitive underneath the base64
+    module; calling it directly skips the wrapper's validation and
+    line-wrapping logic, and building the URL as bytes means one
+    decode at the end instead of one per fragment.
+    """
+    return (b"data:image/png;base64," +
+            binascii.b2a_base64(png_bytes, newline=False)).decode('ascii')
+
+
+@functools.lru_cache(maxsize=32)
+def _encode_signature(signature_path, mtime_ns, size):
+    """
+    Encode a signature file as a data URL, cached by file identity.
+
+    The (path, mtime_ns, size) key makes the cache self-invalidating:
+    touching the file changes the key and forces a re-encode. Results
+    are also persisted to a sidecar under <dir>/.cache so the PIL
+    decode/resize/re-encode pipeline runs once per file version even
+    across process restarts.
+
+    Args:
+        signature_path (str): Absolute or relative path to the image
+        mtime_ns (int): File modification time in nanoseconds
+        size (int): File size in bytes
+
+    Returns:
+        str: Base64 encoded image data URL
+    """
+    cache_dir = Path(signature_path).parent / '.cache'
+    path_hash = _cache_key_digest(str(signature_path).encode('utf-8'))
+    sidecar = cache_dir / f"{path_hash}.{mtime_ns}.b64"
+
+    try:
+        return sidecar.read_text(encoding='ascii')
+    except OSError:
+        pass
+
+    with Image.open(signature_path) as img:
+        # Ensure signature has transparent background
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+
+        # Resize if too large (max width 200px)
+        if img.width > 200:
+            ratio = 200 / img.width
+            new_height = int(img.height * ratio)
+            img = img.resize((200, new_height), Image.Resampling.LANCZOS)
+
+        # Convert to base64
+        buffer = BytesIO()
+        img.save(buffer, format='PNG')
+
+    data_url = _png_data_url(buffer.getvalue())
+
+    try:
+        cache_dir.mkdir(exist_ok=True)
+        # Drop sidecars for stale versions of this file before writing
+        for stale in cache_dir.glob(f"{path_hash}.*.b64"):
+            stale.unlink(missing_ok=True)
+        sidecar.write_text(data_url, encoding='ascii')
+    except OSError:
+        pass  # Cache is best-effort; the encoded result is still valid
+
+    return data_url
+
 
 class SignatureManager:
     def __init__(self, signatures_dir="signatures"):
@@ -33,32 +144,66 @@ class SignatureManager:
             str: Base64 encoded image data URL
         """
         signature_path = self.signatures_dir / signature_file
-        
-        if not signature_path.exists():
+
+        try:
+            stat = os.stat(signature_path)
+        except OSError:
             print(f"Warning: Signature file not found: {signature_path}")
             return None
-        
+
+        # Prebaked fast path: if a baked PNG at the final size exists
+        # and is at least as new as the source, skip PIL entirely and
+        # just base64 the ready-made bytes
+        baked_path = self._baked_path(signature_path)
+        try:
+            if os.stat(baked_path).st_mtime_ns >= stat.st_mtime_ns:
+                return _png_data_url(baked_path.read_bytes())
+        except OSError:
+            pass
+
+        try:
+            return _encode_signature(str(signature_path),
+                                     stat.st_mtime_ns, stat.st_size)
+        except Exception as e:
+            print(f"Error loading signature: {e}")
+            return None
+
+    @staticmethod
+    def _baked_path(signature_path):
+        """Path of the prebaked PNG for a signature source file"""
+        return signature_path.with_name(signature_path.stem + '.cached.png')
+
+    def prebake(self, signature_file):
+        """
+        Pre-resize a signature to its final size and mode once
+
+        Runs the RGBA conversion and LANCZOS resize offline and writes
+        the result next to the source as <name>.cached.png, so runtime
+        loads reduce to a file read plus base64 — no PIL in the hot
+        path. Re-run after replacing the source image.
+
+        Args:
+            signature_file (str): Signature image filename
+
+        Returns:
+            Path: Path to the baked PNG, or None on failure
+        """
+        signature_path = self.signatures_dir / signature_file
+
         try:
             with Image.open(signature_path) as img:
-                # Ensure signature has transparent background
                 if img.mode != 'RGBA':
                     img = img.convert('RGBA')
-                
-                # Resize if too large (max width 200px)
                 if img.width > 200:
                     ratio = 200 / img.width
                     new_height = int(img.height * ratio)
                     img = img.resize((200, new_height), Image.Resampling.LANCZOS)
-                
-                # Convert to base64
-                buffer = BytesIO()
-                img.save(buffer, format='PNG')
-                img_base64 = base64.b64encode(buffer.getvalue()).decode()
-                
-                return f"data:image/png;base64,{img_base64}"
-                
+
+                baked_path = self._baked_path(signature_path)
+                img.save(baked_path, format='PNG')
+                return baked_path
         except Exception as e:
-            print(f"Error loading signature: {e}")
+            print(f"Error prebaking signature: {e}")
             return None
     
     def create_signature_placeholder(self, width=200, height=50):
@@ -73,15 +218,10 @@ class SignatureManager:
             str: Base64 encoded placeholder image
         """
         try:
-            # Create transparent image
-            img = Image.new('RGBA', (width, height), (255, 255, 255, 0))
-            
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            img_base64 = base64.b64encode(buffer.getvalue()).decode()
-            
-            return f"data:image/png;base64,{img_base64}"
-            
+            # Assembled from raw PNG chunks (memoized per size) — no
+            # PIL work for what is a constant transparent rectangle
+            return _png_data_url(_transparent_png(width, height))
+
         except Exception as e:
             print(f"Error creating placeholder: {e}")
             return None
@@ -93,13 +233,17 @@ class SignatureManager:
         Returns:
             list: List of signature filenames
         """
-        signature_files = []
-        
-        for file_path in self.signatures_dir.glob("*"):
-            if file_path.is_file() and file_path.suffix.lower() in ['.png', '.jpg', '.jpeg', '.gif']:
-                signature_files.append(file_path.name)
-        
-        return signature_files
+        # os.scandir reuses the dirent type info from the directory
+        # listing, so no per-entry stat; endswith on a tuple is one
+        # C-level check instead of a list allocated per file. Baked
+        # copies written by prebake() are implementation detail, not
+        # selectable signatures.
+        exts = ('.png', '.jpg', '.jpeg', '.gif')
+        with os.scandir(self.signatures_dir) as entries:
+            return [entry.name for entry in entries
+                    if entry.is_file()
+                    and entry.name.lower().endswith(exts)
+                    and not entry.name.endswith('.cached.png')]
     
     def setup_sample_signatures(self):
         """
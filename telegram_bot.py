@@ -4,11 +4,15 @@ Handles user interactions and document generation requests
 """
 
 import asyncio
+import functools
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime
+from pathlib import Path
 from typing import List
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, MessageEntity, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
 
 from bot_storage import storage
@@ -16,6 +20,98 @@ from config import TELEGRAM_CONFIG, COMPANY_INFO, BANK_INFO, CLIENT_INFO, FINANC
 from generate_documents import UnifiedDocumentGenerator
 
 
+# Markdown constructs used by the static texts below: ```pre```,
+# **bold** and `code`
+_MD_TOKEN_RE = re.compile(r'```\n?(.*?)\n?```|\*\*(.*?)\*\*|`([^`]*)`', re.DOTALL)
+
+
+def _utf16_len(text):
+    """Length in UTF-16 code units — the offset unit Telegram uses"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _parse_markdown(markdown_text):
+    """
+    Convert static Markdown to plain text plus MessageEntity list
+
+    Sending pre-parsed entities instead of parse_mode='Markdown' spares
+    Telegram's server from re-parsing the same static string on every
+    reply. Entity offsets/lengths are in UTF-16 code units per the Bot
+    API spec, which matters here because the texts contain emoji
+    (surrogate pairs).
+
+    Args:
+        markdown_text (str): Text with **bold**, `code` and ``` blocks
+
+    Returns:
+        tuple: (plain_text, tuple of MessageEntity)
+    """
+    plain_parts = []
+    entities = []
+    pos = 0
+    offset = 0
+
+    for match in _MD_TOKEN_RE.finditer(markdown_text):
+        literal = markdown_text[pos:match.start()]
+        plain_parts.append(literal)
+        offset += _utf16_len(literal)
+
+        pre, bold, code = match.groups()
+        if pre is not None:
+            content, entity_type = pre, MessageEntity.PRE
+        elif bold is not None:
+            content, entity_type = bold, MessageEntity.BOLD
+        else:
+            content, entity_type = code, MessageEntity.CODE
+
+        entities.append(MessageEntity(
+            type=entity_type, offset=offset, length=_utf16_len(content)))
+        plain_parts.append(content)
+        offset += _utf16_len(content)
+        pos = match.end()
+
+    plain_parts.append(markdown_text[pos:])
+    return ''.join(plain_parts), tuple(entities)
+
+
+# Static reply texts, parsed to text + entities once at import instead
+# of per message
+WELCOME_TEXT, WELCOME_ENTITIES = _parse_markdown(
+    "🚀 **Document Generator Bot**\n\n"
+    "Я помогу вам создать документы (Счет и Акт) с минимальными усилиями!\n\n"
+    "**Команды:**\n"
+    "• `/generate` - Создать документы\n"
+    "• `/status` - Статистика генерации\n"
+    "• `/help` - Помощь\n\n"
+    "Готов к работе! 📋"
+)
+
+HELP_TEXT, HELP_ENTITIES = _parse_markdown(
+    "📋 **Как использовать бота:**\n\n"
+    "1️⃣ Используйте `/generate` для создания документов\n"
+    "2️⃣ Я покажу последние услуги и спрошу об обновлениях\n"
+    "3️⃣ Введите услуги построчно (одна услуга = одна строка)\n"
+    "4️⃣ Подтвердите дату генерации\n"
+    "5️⃣ Получите готовые PDF файлы\n\n"
+    "**Формат услуг:**\n"
+    "```\n"
+    "Консультационные услуги\n"
+    "Анализ проектов\n"
+    "Разработка стратегии\n"
+    "```\n\n"
+    "**Другие команды:**\n"
+    "• `/status` - Посмотреть статистику\n"
+    "• `/help` - Эта справка"
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _format_services(services_tuple):
+    """Format a services tuple for display (memoized — the same list
+    is rendered by /status, /generate and the date confirmation)"""
+    return storage.format_services_list(list(services_tuple))
+
+
 class DocumentBot:
     """Telegram bot for document generation"""
     
@@ -23,9 +119,39 @@ class DocumentBot:
         self.bot_token = TELEGRAM_CONFIG['bot_token']
         self.authorized_chat_id = TELEGRAM_CONFIG['chat_id']
         self.generator = UnifiedDocumentGenerator()
-        
+
         if not self.bot_token:
             raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
+
+        # Encode the signature once at startup; the bot typically runs
+        # for days, so every /generate reuses this in-memory copy
+        self.signature_path = 'signatures/YL_Signature.png'
+        self._signature_data = self.generator.preload_signature(self.signature_path)
+
+        # PDF generation is CPU-bound; running it in worker processes
+        # keeps the event loop serving other chats (and sidesteps the
+        # GIL so two requests can render in parallel)
+        self._pool = ProcessPoolExecutor(max_workers=2)
+
+        # Services list cached in-process, refreshed on generation;
+        # handlers avoid re-reading storage on every message
+        self._services_cache = None
+
+        # Generated documents memoized by (services, date, client):
+        # re-taps with identical input skip the whole PDF pipeline.
+        # Bounded FIFO — 32 entries is weeks of daily generations
+        self._doc_cache = {}
+
+        # The main keyboard never changes — build it once instead of
+        # allocating buttons and markup on every reply
+        self._main_kb = ReplyKeyboardMarkup(
+            [
+                [KeyboardButton("📋 Создать документы"), KeyboardButton("📊 Статистика")],
+                [KeyboardButton("❓ Помощь")]
+            ],
+            resize_keyboard=True,
+            is_persistent=True
+        )
     
     def is_authorized(self, chat_id: str) -> bool:
         """Check if chat_id is authorized"""
@@ -33,13 +159,15 @@ class DocumentBot:
             return True  # Allow all if no specific chat_id configured
         return str(chat_id) == str(self.authorized_chat_id)
     
+    def _get_services(self):
+        """Return the last services list, hitting storage only once"""
+        if self._services_cache is None:
+            self._services_cache = storage.get_last_services()
+        return self._services_cache
+
     def get_main_keyboard(self):
         """Get the main keyboard with buttons"""
-        keyboard = [
-            [KeyboardButton("📋 Создать документы"), KeyboardButton("📊 Статистика")],
-            [KeyboardButton("❓ Помощь")]
-        ]
-        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, is_persistent=True)
+        return self._main_kb
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
@@ -49,20 +177,10 @@ class DocumentBot:
             await update.message.reply_text("❌ Unauthorized access")
             return
         
-        welcome_text = (
-            "🚀 **Document Generator Bot**\n\n"
-            "Я помогу вам создать документы (Счет и Акт) с минимальными усилиями!\n\n"
-            "**Команды:**\n"
-            "• `/generate` - Создать документы\n"
-            "• `/status` - Статистика генерации\n"
-            "• `/help` - Помощь\n\n"
-            "Готов к работе! 📋"
-        )
-        
         await update.message.reply_text(
-            welcome_text,
-            parse_mode='Markdown',
-            reply_markup=self.get_main_keyboard()
+            WELCOME_TEXT,
+            entities=WELCOME_ENTITIES,
+            reply_markup=self._main_kb
         )
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -70,28 +188,10 @@ class DocumentBot:
         if not self.is_authorized(update.effective_chat.id):
             return
         
-        help_text = (
-            "📋 **Как использовать бота:**\n\n"
-            "1️⃣ Используйте `/generate` для создания документов\n"
-            "2️⃣ Я покажу последние услуги и спрошу об обновлениях\n"
-            "3️⃣ Введите услуги построчно (одна услуга = одна строка)\n"
-            "4️⃣ Подтвердите дату генерации\n"
-            "5️⃣ Получите готовые PDF файлы\n\n"
-            "**Формат услуг:**\n"
-            "```\n"
-            "Консультационные услуги\n"
-            "Анализ проектов\n"
-            "Разработка стратегии\n"
-            "```\n\n"
-            "**Другие команды:**\n"
-            "• `/status` - Посмотреть статистику\n"
-            "• `/help` - Эта справка"
-        )
-        
         await update.message.reply_text(
-            help_text,
-            parse_mode='Markdown',
-            reply_markup=self.get_main_keyboard()
+            HELP_TEXT,
+            entities=HELP_ENTITIES,
+            reply_markup=self._main_kb
         )
     
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -100,21 +200,21 @@ class DocumentBot:
             return
         
         stats = storage.get_generation_stats()
-        last_services = storage.get_last_services()
-        
+        last_services = self._get_services()
+
         status_text = (
             f"📊 **Статистика генерации:**\n\n"
             f"📋 Всего сгенерировано: {stats['count']}\n"
             f"📅 Последняя генерация: {stats['last_date'] or 'Никогда'}\n"
             f"🔢 Услуг в последнем отчете: {stats['last_services_count']}\n\n"
             f"**Последние услуги:**\n"
-            f"```\n{storage.format_services_list(last_services)}\n```"
+            f"```\n{_format_services(tuple(last_services))}\n```"
         )
         
         await update.message.reply_text(
             status_text,
             parse_mode='Markdown',
-            reply_markup=self.get_main_keyboard()
+            reply_markup=self._main_kb
         )
     
     async def generate_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -126,10 +226,10 @@ class DocumentBot:
             return
         
         # Show last services and ask for updates
-        last_services = storage.get_last_services()
-        
+        last_services = self._get_services()
+
         if last_services:
-            services_text = storage.format_services_list(last_services)
+            services_text = _format_services(tuple(last_services))
             message_text = (
                 f"📋 **Последние услуги:**\n\n```\n{services_text}\n```\n\n"
                 f"Хотите использовать эти услуги или обновить список?"
@@ -165,7 +265,7 @@ class DocumentBot:
         
         if query.data == "use_last_services":
             # Use last services, proceed to date confirmation
-            services = storage.get_last_services()
+            services = self._get_services()
             await self.confirm_date(query, context, services)
             
         elif query.data == "update_services":
@@ -199,7 +299,7 @@ class DocumentBot:
         context.user_data['pending_services'] = services
         
         today = date.today()
-        services_text = storage.format_services_list(services)
+        services_text = _format_services(tuple(services))
         
         message_text = (
             f"📅 **Подтвердите дату генерации документов:**\n\n"
@@ -252,9 +352,11 @@ class DocumentBot:
         if not self.is_authorized(update.effective_chat.id):
             return
         
-        # Parse services from message
+        # Parse services from message. splitlines() is a single C-level
+        # scan (and handles \r\n), and filter(None, ...) drops the
+        # blank lines without a second strip per line
         services_text = update.message.text.strip()
-        services = [line.strip() for line in services_text.split('\n') if line.strip()]
+        services = list(filter(None, (line.strip() for line in services_text.splitlines())))
         
         if not services:
             await update.message.reply_text(
@@ -279,64 +381,95 @@ class DocumentBot:
         )
         
         try:
-            # Update CLIENT_INFO with generation date if needed
-            client_info = CLIENT_INFO.copy()
-            # Keep original contract date, generation_date is just for document dates
-            
-            # Generate documents
-            results = self.generator.generate_both_documents(
-                services,
-                COMPANY_INFO,
-                BANK_INFO,
-                client_info,
-                FINANCIAL_SETTINGS,
-                'signatures/YL_Signature.png',
-                generation_date
-            )
+            # The generator treats client info as read-only (contract
+            # date stays fixed; generation_date only affects document
+            # dates), so no per-request copy is needed
+            client_info = CLIENT_INFO
+
+            # Identical requests (same services, date, client) reuse
+            # the already-generated files if they still exist on disk
+            cache_key = (tuple(services), generation_date.toordinal(),
+                         tuple(sorted(client_info.items())))
+            results = self._doc_cache.get(cache_key)
+            if results is not None and not (
+                    os.path.exists(results.act_path) and
+                    os.path.exists(results.invoice_path)):
+                del self._doc_cache[cache_key]
+                results = None
+
+            if results is None:
+                # Generate documents in a worker process so the event
+                # loop stays responsive while PDFs render
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self._pool,
+                    functools.partial(
+                        self.generator.generate_both_documents,
+                        services,
+                        COMPANY_INFO,
+                        BANK_INFO,
+                        client_info,
+                        FINANCIAL_SETTINGS,
+                        self.signature_path,
+                        generation_date,
+                        signature_data=self._signature_data
+                    )
+                )
+                if results.act_path and results.invoice_path:
+                    # Filenames are month-granular, so this generation
+                    # overwrote any earlier documents at the same
+                    # paths — drop cache entries that point at them or
+                    # a later re-tap would resend the wrong content
+                    self._doc_cache = {
+                        key: cached for key, cached in self._doc_cache.items()
+                        if cached.act_path != results.act_path
+                        and cached.invoice_path != results.invoice_path
+                    }
+                    if len(self._doc_cache) >= 32:
+                        self._doc_cache.pop(next(iter(self._doc_cache)))
+                    self._doc_cache[cache_key] = results
             
             # Save services for next time
             storage.set_last_services(services)
+            self._services_cache = services
             
             # Send results
-            if results['act_path'] and results['invoice_path']:
+            if results.act_path and results.invoice_path:
                 # Send both files
                 success_text = (
                     f"✅ **Документы успешно созданы!**\n\n"
                     f"📋 Услуг: {len(services)}\n"
-                    f"💰 Сумма: {results['act_amount']:,.0f} RUB\n"
+                    f"💰 Сумма: {results.amount:,.0f} RUB\n"
                     f"📅 Дата: {generation_date.strftime('%d.%m.%Y')}\n\n"
                     f"📄 Отправляю файлы..."
                 )
                 
                 await query.edit_message_text(success_text, parse_mode='Markdown')
                 
-                # Send files
+                # Send files concurrently: the two uploads are
+                # independent and network-bound, and reading off-loop
+                # keeps the event loop free for other chats
                 chat_id = query.message.chat_id
-                
-                # Send Act
-                with open(results['act_path'], 'rb') as act_file:
-                    await context.bot.send_document(
-                        chat_id=chat_id,
-                        document=act_file,
-                        filename=os.path.basename(results['act_path']),
-                        caption="📋 Акт оказанных услуг"
-                    )
-                
-                # Send Invoice
-                with open(results['invoice_path'], 'rb') as invoice_file:
+
+                async def send_pdf(path, caption):
+                    data = await asyncio.to_thread(Path(path).read_bytes)
                     await context.bot.send_document(
                         chat_id=chat_id,
-                        document=invoice_file,
-                        filename=os.path.basename(results['invoice_path']),
-                        caption="🧾 Счет на оплату"
+                        document=data,
+                        filename=os.path.basename(path),
+                        caption=caption
                     )
-                
+
+                await asyncio.gather(
+                    send_pdf(results.act_path, "📋 Акт оказанных услуг"),
+                    send_pdf(results.invoice_path, "🧾 Счет на оплату")
+                )
+
             else:
                 # Error in generation
                 error_text = (
                     f"❌ **Ошибка при генерации документов**\n\n"
-                    f"Акт: {'✅' if results['act_path'] else '❌'}\n"
-                    f"Счет: {'✅' if results['invoice_path'] else '❌'}"
+                    f"Акт: {'✅' if results.act_path else '❌'}\n"
+                    f"Счет: {'✅' if results.invoice_path else '❌'}"
                 )
                 await query.edit_message_text(error_text, parse_mode='Markdown')
                 
@@ -364,19 +497,55 @@ class DocumentBot:
         
         return application
     
+    def _preflight(self):
+        """
+        Validate files and directories before connecting to Telegram
+
+        Missing signature or an unwritable output directory would
+        otherwise surface only on the first /generate, after startup
+        and the Telegram handshake have already been paid for.
+        """
+        if not os.path.isfile(self.signature_path):
+            print(f"⚠️  Signature file not found: {self.signature_path}")
+            print("   Documents will be generated without a signature")
+
+        output_dir = 'output'
+        os.makedirs(output_dir, exist_ok=True)
+        if not os.access(output_dir, os.W_OK):
+            raise RuntimeError(f"Output directory is not writable: {output_dir}")
+
+        # Storage loads (or creates) bot_data.json at import; reading
+        # the stats here proves it is usable
+        stats = storage.get_generation_stats()
+        print(f"📊 Storage OK ({stats['count']} generations recorded)")
+
     async def run(self):
         """Run the bot"""
         print("🤖 Starting Telegram Bot...")
+        self._preflight()
         print(f"👤 Authorized chat ID: {self.authorized_chat_id or 'All chats'}")
         
         application = self.create_application()
-        
+
         # Start the bot
         await application.initialize()
         await application.start()
-        await application.updater.start_polling()
-        
-        print("✅ Bot is running! Press Ctrl+C to stop.")
+
+        # Webhook mode when configured: Telegram pushes updates over a
+        # kept-alive connection instead of the bot polling getUpdates
+        # once a second, cutting idle traffic and delivery latency
+        webhook_url = TELEGRAM_CONFIG.get('webhook_url')
+        if webhook_url:
+            await application.updater.start_webhook(
+                listen='0.0.0.0',
+                port=TELEGRAM_CONFIG['webhook_port'],
+                url_path=self.bot_token,
+                webhook_url=f"{webhook_url.rstrip('/')}/{self.bot_token}"
+            )
+            print(f"✅ Bot is running (webhook on port {TELEGRAM_CONFIG['webhook_port']})! Press Ctrl+C to stop.")
+        else:
+            await application.updater.start_polling()
+            print("✅ Bot is running! Press Ctrl+C to stop.")
         
         try:
             # Keep the bot running